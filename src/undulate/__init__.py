@@ -0,0 +1,17 @@
+"""
+generate waveform diagrams of signals based on their textual representation
+
+    >>> import undulate
+    >>> svg = undulate.render({"clk": {"wave": "p..."}}, engine="svg")
+"""
+
+__version__ = "2024.1"
+
+
+def __getattr__(name: str):
+    # imported on first use so that the command line does not load it twice
+    if name == "render":
+        from undulate.cli import render
+
+        return render
+    raise AttributeError(f"module 'undulate' has no attribute '{name}'")
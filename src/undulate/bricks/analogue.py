@@ -6,6 +6,8 @@ common functions in the analogue context
 
 import math
 import random
+from itertools import repeat
+from typing import List
 from undulate.bricks.generic import (
     Brick,
     BrickFactory,
@@ -15,6 +17,15 @@ from undulate.bricks.generic import (
     safe_eval,
 )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below this number of samples, the overhead of numpy exceeds its gain
+# (measured with numpy 2.4: even at 40 samples, a brick of 50 px)
+NUMPY_MIN_SAMPLES = 48
+
 CONTEXT = {
     "time": [],
     "Tmax": 20,
@@ -32,6 +43,23 @@ CONTEXT = {
 }
 
 
+def eval_context(width: float) -> dict:
+    """
+    Namespace to evaluate the analogue expression of a brick.
+    The shared CONTEXT is copied to never leak the time range
+    of a brick into another drawing
+
+    Args:
+        width: width of the brick
+    Returns:
+        CONTEXT with 'Tmax' and 'time' of the brick
+    """
+    ctx = dict(CONTEXT)
+    ctx["Tmax"] = width
+    ctx["time"] = range(int(width + 1))
+    return ctx
+
+
 def transform_y(y: float, brick_height: float = 20):
     """
     Transform values in the [VSSA;VDDA] range to the internal [0;brick_height]
@@ -48,6 +76,80 @@ def transform_y(y: float, brick_height: float = 20):
     return brick_height * (1 - scaled_value)
 
 
+def metastable_samples(
+    time: range, width: float, height: float, phase: float = 0.0
+) -> List[SplineSegment]:
+    """
+    Sample a damped oscillation settling at the end of the brick.
+    With numpy installed, wide bricks are computed as a packed array
+    of y-coordinates turned into segments at once
+
+    Args:
+        time: x-coordinates of the samples
+        width: width of the brick
+        height: height of the brick
+        phase: phase of the oscillation, pi to start going up
+    Returns:
+        one 'L' spline segment per sample
+    """
+    if numpy is not None and len(time) >= NUMPY_MIN_SAMPLES:
+        t = numpy.arange(time.start, time.stop, dtype=float)
+        y = numpy.sin(phase + 8 * numpy.pi * t / width)
+        y = (1 + numpy.exp(2 * (t - width) / width) * y) * 0.5 * height
+        return list(map(SplineSegment, repeat("L"), time, y.tolist()))
+    return [
+        SplineSegment(
+            "L",
+            t,
+            (
+                1
+                + math.exp(2 * (t - width) / width)
+                * math.sin(phase + 8 * math.pi * t / width)
+            )
+            * 0.5
+            * height,
+        )
+        for t in time
+    ]
+
+
+def simplify(points: list, tolerance: float = 0.0) -> list:
+    """
+    Drop the vertices of a polyline which are closer than the tolerance
+    to the simplified polyline (Ramer-Douglas-Peucker algorithm)
+
+    Args:
+        points: vertices of the polyline (Point or SplineSegment)
+        tolerance: maximum distance in px between the polyline and its
+            simplification, 0 to keep all vertices
+    Returns:
+        the vertices kept, the first and last ones are always kept
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return points
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        a, b = points[first], points[last]
+        dx, dy = b.x - a.x, b.y - a.y
+        norm = math.hypot(dx, dy)
+        dmax, index = 0.0, first
+        for i in range(first + 1, last):
+            p = points[i]
+            if norm == 0:
+                d = math.hypot(p.x - a.x, p.y - a.y)
+            else:
+                d = abs(dy * (p.x - a.x) - dx * (p.y - a.y)) / norm
+            if d > dmax:
+                dmax, index = d, i
+        if dmax > tolerance:
+            keep[index] = True
+            stack.extend([(first, index), (index, last)])
+    return [p for p, k in zip(points, keep) if k]
+
+
 class MetaToZero(Brick):
     """
     Metastable state representation resolving to GND
@@ -63,6 +165,7 @@ class MetaToZero(Brick):
 
         Parameters:
             slewing (float > 0): only for the connection with adjacent bricks
+            analogue_tolerance (float >= 0): maximum error in px to simplify the curve
         """
         Brick.__init__(self, **kwargs)
         if math.isnan(self.last_y):
@@ -74,20 +177,12 @@ class MetaToZero(Brick):
             time = range(int(self.dt), int(self.width * 0.75 + 2))
         # prepare spline
         _tmp = [SplineSegment("m", 0.0, self.last_y)]
-        for i, t in enumerate(time):
-            _tmp.append(
-                SplineSegment(
-                    "L",
-                    t,
-                    (
-                        1
-                        + math.exp(2 * (t - self.width) / self.width)
-                        * math.sin(8 * math.pi * t / self.width)
-                    )
-                    * 0.5
-                    * self.height,
-                )
+        _tmp.extend(
+            simplify(
+                metastable_samples(time, self.width, self.height),
+                kwargs.get("analogue_tolerance", 0.0),
             )
+        )
         x, y = _tmp[-1].x, _tmp[-1].y
         dx = max((self.height - y) * self.slewing / self.height, (self.height - y))
         _tmp.extend(
@@ -115,6 +210,7 @@ class MetaToOne(Brick):
 
         Parameters:
             slewing (float > 0): only for the connection with adjacent bricks
+            analogue_tolerance (float >= 0): maximum error in px to simplify the curve
         """
         Brick.__init__(self, **kwargs)
         if math.isnan(self.last_y):
@@ -126,20 +222,12 @@ class MetaToOne(Brick):
             time = range(int(self.dt), int(self.width * 0.75 + 2))
         # prepare spline
         _tmp = [SplineSegment("m", 0.0, self.last_y)]
-        for i, t in enumerate(time):
-            _tmp.append(
-                SplineSegment(
-                    "L",
-                    t,
-                    (
-                        1
-                        + math.exp(2 * (t - self.width) / self.width)
-                        * math.sin(math.pi + 8 * math.pi * t / self.width)
-                    )
-                    * 0.5
-                    * self.height,
-                )
+        _tmp.extend(
+            simplify(
+                metastable_samples(time, self.width, self.height, math.pi),
+                kwargs.get("analogue_tolerance", 0.0),
             )
+        )
         x, y = _tmp[-1].x, _tmp[-1].y
         dx = max(y * self.slewing / self.height, y)
         _tmp.extend(
@@ -168,10 +256,11 @@ class Cap(Brick):
         """
         Brick.__init__(self, **kwargs)
         # pre-process analogue
-        CONTEXT["Tmax"] = self.width
-        CONTEXT["time"] = range(int(self.width + 1))
         analogue = kwargs["analogue"]
-        value = safe_eval(analogue, CONTEXT) if isinstance(analogue, str) else analogue
+        if isinstance(analogue, str):
+            value = safe_eval(analogue, eval_context(self.width))
+        else:
+            value = analogue
         y = transform_y(value, self.height)
         # set final value if necessary
         if self.is_first or math.isnan(self.last_y):
@@ -211,10 +300,11 @@ class Step(Brick):
         """
         Brick.__init__(self, **kwargs)
         # pre-process analogue
-        CONTEXT["Tmax"] = self.width
-        CONTEXT["time"] = range(int(self.width + 1))
         analogue = kwargs["analogue"]
-        value = safe_eval(analogue, CONTEXT) if isinstance(analogue, str) else analogue
+        if isinstance(analogue, str):
+            value = safe_eval(analogue, eval_context(self.width))
+        else:
+            value = analogue
         y = transform_y(value, self.height)
         # set final value if necessary
         if self.is_first or math.isnan(self.last_y):
@@ -244,13 +334,16 @@ class Analogue(Brick):
         """
         Args:
             analogue (List[Tuple[float, float]]): list of points (relative time, voltage in [VSSA;VDDA] range)
+        Parameters:
+            analogue_tolerance (float >= 0): maximum error in px to simplify the curve
         """
         Brick.__init__(self, **kwargs)
         # pre-process analogue
-        CONTEXT["Tmax"] = self.width
-        CONTEXT["time"] = range(int(self.width + 1))
         analogue = kwargs["analogue"]
-        points = safe_eval(analogue, CONTEXT) if isinstance(analogue, str) else analogue
+        if isinstance(analogue, str):
+            points = safe_eval(analogue, eval_context(self.width))
+        else:
+            points = analogue
         # set final point if necessary
         if self.is_first or math.isnan(self.last_y):
             self.last_y = self.height
@@ -258,13 +351,15 @@ class Analogue(Brick):
         _tmp = [Point(0.0, self.last_y)]
         for point in points:
             _tmp.append(Point(point[0], transform_y(point[1], self.height)))
+        _tmp = simplify(_tmp, kwargs.get("analogue_tolerance", 0.0))
         self.paths.append(Drawable("path", _tmp))
 
 
 def initialize() -> None:
     """register defined digital blocks in the rendering system"""
-    BrickFactory.register("m", MetaToZero)
-    BrickFactory.register("M", MetaToOne)
+    BrickFactory.register("m", MetaToZero, cache=True)
+    BrickFactory.register("M", MetaToOne, cache=True)
+    # expressions can be random (rnd) so each brick is evaluated
     BrickFactory.register("s", Step, tags=["analogue"], params={"analogue": 0.0})
     BrickFactory.register("c", Cap, tags=["analogue"], params={"analogue": 0.0})
     BrickFactory.register("a", Analogue, tags=["analogue"], params={"analogue": [(0, 0)]})
@@ -9,6 +9,7 @@ import undulate.logger as log
 from undulate.bricks.generic import (
     ArrowDescription,
     Brick,
+    BrickDescriptor,
     BrickFactory,
     Drawable,
     FilterBank,
@@ -878,7 +879,7 @@ class Filler(Brick):
 
 
 # ======== Filtering Functions ========
-def filter_width(waveform: List[Brick]) -> List[Brick]:
+def filter_width(waveform: List[BrickDescriptor]) -> List[BrickDescriptor]:
     """
     Compute the width/height of each brick considering the following properties:
 
@@ -898,11 +899,11 @@ def filter_width(waveform: List[Brick]) -> List[Brick]:
         brick_height = brick.args.get("brick_height", 20.0) * brick.args.get("vscale", 1.0)
         brick.args["brick_width"] = brick_width
         brick.args["brick_height"] = brick_height
-        ans.append(BrickFactory.create(brick.symbol, **brick.args))
+        ans.append(brick)
     return ans
 
 
-def filter_repeat(waveform: List[Brick]) -> List[Brick]:
+def filter_repeat(waveform: List[BrickDescriptor]) -> List[BrickDescriptor]:
     """
     Compute the number of size expension for a given brick (using '.' symbol) at
     the exception of clock signals where the brick '.' means duplication.
@@ -921,7 +922,11 @@ def filter_repeat(waveform: List[Brick]) -> List[Brick]:
             continue
         # always repeat a clock signal and after gap repeat the last valid symbol
         if "clock" in BrickFactory.tags.get(previous_symbol, []) or previous_symbol == "|":
-            ans.append(BrickFactory.create(previous_symbol, **brick.args))
+            ans.append(
+                BrickFactory.describe(
+                    previous_symbol, *brick.args.maps[1:], **brick.args.maps[0]
+                )
+            )
         # extend the width of other symbols
         else:
             ans[previous_index].repeat += 1
@@ -934,7 +939,7 @@ def filter_repeat(waveform: List[Brick]) -> List[Brick]:
     return ans
 
 
-def filter_phase_pos(waveform: List[Brick]) -> List[Brick]:
+def filter_phase_pos(waveform: List[BrickDescriptor]) -> List[BrickDescriptor]:
     """
     Adjust the size of the first and last brick of signal based on the following
     properties:
@@ -984,19 +989,19 @@ def filter_phase_pos(waveform: List[Brick]) -> List[Brick]:
                 args = brick.args.copy()
                 offx = abs(brick_width * phase)
                 args.update({"brick_width": offx, "y": brick.get_first_y()})
-                ans.append(BrickFactory.create("f", **args))
+                ans.append(BrickFactory.describe("f", **args))
                 brick.args["is_first"] = False
-            ans.append(BrickFactory.create(brick.symbol, **brick.args))
+            ans.append(brick)
     return ans
 
 
-def filter_transition(waveform: List[Brick]) -> List[Brick]:
+def filter_transition(waveform: List[BrickDescriptor]) -> List[BrickDescriptor]:
     """
     Smooth abutment of different brick to prevent glitches
     and fusion data brick of the same symbol with the same 'data' value
     """
     ans = []
-    previous_brick = BrickFactory.create(" ")
+    previous_brick = BrickFactory.describe(" ")
     for brick in waveform:
         # clocks combination
         if previous_brick.symbol.lower() + brick.symbol.lower() in [
@@ -1012,9 +1017,6 @@ def filter_transition(waveform: List[Brick]) -> List[Brick]:
         ]:
             brick.args["ignore_start_transition"] = True
             previous_brick.args["ignore_end_transition"] = True
-            previous_brick = BrickFactory.create(
-                previous_brick.symbol, **previous_brick.args
-            )
         # join consecutive brick
         brick.args["last_y"] = previous_brick.get_last_y()
         # adjust transistion from data to non-data
@@ -1033,19 +1035,13 @@ def filter_transition(waveform: List[Brick]) -> List[Brick]:
                     brick.args["ignore_start_transition"] = True
                     brick.args["hide_data"] = True
                     previous_brick.args["ignore_end_transition"] = True
-                    previous_brick = BrickFactory.create(
-                        previous_brick.symbol, **previous_brick.args
-                    )
-        ans.append(BrickFactory.create(brick.symbol, **brick.args))
+        ans.append(brick)
         if "repeat" not in BrickFactory.tags[brick.symbol]:
             if (
                 "data" in BrickFactory.tags[previous_brick.symbol]
                 and "data" not in BrickFactory.tags[brick.symbol]
             ):
                 previous_brick.args["first_y"] = ans[-1].get_first_y()
-                previous_brick = BrickFactory.create(
-                    previous_brick.symbol, **previous_brick.args
-                )
             previous_brick = ans[-1]
     return ans
 
@@ -1054,71 +1050,135 @@ def filter_transition(waveform: List[Brick]) -> List[Brick]:
 def initialize() -> None:
     """register defined digital blocks in the rendering system"""
     BrickFactory.register(
-        "n", Nclk, tags=["clock"], params={"duty_cycle": 0.5, "slewing": 0, "period": 1}
+        "n",
+        Nclk,
+        tags=["clock"],
+        params={"duty_cycle": 0.5, "slewing": 0, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
         "N",
         NclkArrow,
         tags=["clock"],
         params={"duty_cycle": 0.5, "slewing": 0, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
-        "p", Pclk, tags=["clock"], params={"duty_cycle": 0.5, "slewing": 0, "period": 1}
+        "p",
+        Pclk,
+        tags=["clock"],
+        params={"duty_cycle": 0.5, "slewing": 0, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
         "P",
         PclkArrow,
         tags=["clock"],
         params={"duty_cycle": 0.5, "slewing": 0, "period": 1},
+        cache=True,
+    )
+    BrickFactory.register(
+        "l", Low, tags=["clock"], params={"slewing": 0, "period": 1}, cache=True
+    )
+    BrickFactory.register(
+        "L", LowArrow, tags=["clock"], params={"slewing": 0, "period": 1}, cache=True
+    )
+    BrickFactory.register(
+        "h", High, tags=["clock"], params={"slewing": 0, "period": 1}, cache=True
+    )
+    BrickFactory.register(
+        "H", HighArrow, tags=["clock"], params={"slewing": 0, "period": 1}, cache=True
+    )
+    BrickFactory.register("z", HighZ, params={"period": 1}, cache=True)
+    BrickFactory.register("0", Zero, params={"slewing": 0, "period": 1}, cache=True)
+    BrickFactory.register("1", One, params={"slewing": 0, "period": 1}, cache=True)
+    BrickFactory.register(
+        "2",
+        Two,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
+    )
+    BrickFactory.register(
+        "3",
+        Three,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
-    BrickFactory.register("l", Low, tags=["clock"], params={"slewing": 0, "period": 1})
-    BrickFactory.register("L", LowArrow, tags=["clock"], params={"slewing": 0, "period": 1})
-    BrickFactory.register("h", High, tags=["clock"], params={"slewing": 0, "period": 1})
     BrickFactory.register(
-        "H", HighArrow, tags=["clock"], params={"slewing": 0, "period": 1}
+        "4",
+        Four,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
-    BrickFactory.register("z", HighZ, params={"period": 1})
-    BrickFactory.register("0", Zero, params={"slewing": 0, "period": 1})
-    BrickFactory.register("1", One, params={"slewing": 0, "period": 1})
     BrickFactory.register(
-        "2", Two, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "5",
+        Five,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
-        "3", Three, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "6",
+        Six,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
-        "4", Four, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "7",
+        Seven,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
-        "5", Five, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "8",
+        Eight,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
-        "6", Six, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "9",
+        Nine,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
     BrickFactory.register(
-        "7", Seven, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "x", Unknown, tags=["data"], params={"slewing": 3, "period": 1}, cache=True
     )
     BrickFactory.register(
-        "8", Eight, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "X", Garbage, tags=["data"], params={"slewing": 3, "period": 1}, cache=True
     )
     BrickFactory.register(
-        "9", Nine, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "=",
+        Two,
+        tags=["data"],
+        params={"data": "", "slewing": 3, "period": 1},
+        cache=True,
     )
-    BrickFactory.register("x", Unknown, tags=["data"], params={"slewing": 3, "period": 1})
-    BrickFactory.register("X", Garbage, tags=["data"], params={"slewing": 3, "period": 1})
+    BrickFactory.register("|", Gap, tags=["repeat"], params={"period": 1}, cache=True)
+    BrickFactory.register("u", Up, params={"slewing": 0, "period": 1}, cache=True)
+    BrickFactory.register("d", Down, params={"slewing": 0, "period": 1}, cache=True)
     BrickFactory.register(
-        "=", Two, tags=["data"], params={"data": "", "slewing": 3, "period": 1}
+        "i", ImpulseUp, params={"duty_cycle": 0.5, "period": 1}, cache=True
     )
-    BrickFactory.register("|", Gap, tags=["repeat"], params={"period": 1})
-    BrickFactory.register("u", Up, params={"slewing": 0, "period": 1})
-    BrickFactory.register("d", Down, params={"slewing": 0, "period": 1})
-    BrickFactory.register("i", ImpulseUp, params={"duty_cycle": 0.5, "period": 1})
-    BrickFactory.register("I", ImpulseDown, params={"duty_cycle": 0.5, "period": 1})
-    BrickFactory.register(" ", Space)
     BrickFactory.register(
-        ".", Empty, tags=["repeat"], params={"duty_cycle": 0.5, "slewing": 0, "period": 1}
+        "I", ImpulseDown, params={"duty_cycle": 0.5, "period": 1}, cache=True
+    )
+    BrickFactory.register(" ", Space, cache=True)
+    BrickFactory.register(
+        ".",
+        Empty,
+        tags=["repeat"],
+        params={"duty_cycle": 0.5, "slewing": 0, "period": 1},
+        cache=True,
     )
-    BrickFactory.register("f", Filler, params={"period": 1})
+    BrickFactory.register("f", Filler, params={"period": 1}, cache=True)
     FilterBank.register(filter_repeat)
     FilterBank.register(filter_width)
     FilterBank.register(filter_phase_pos)
@@ -5,13 +5,39 @@ to generate a waveform
 
 import ast
 import copy
+import functools
+import contextlib
+import importlib
 from math import nan
-from typing import Callable, Any, Dict, List
-from dataclasses import dataclass
+from collections import ChainMap, OrderedDict
+from typing import Callable, Any, Dict, Iterable, List, Mapping
+from dataclasses import dataclass, fields
 import undulate.logger as log
 
+ENTRY_POINTS_GROUP = "undulate.bricks"
+_LOADED_PLUGINS = set()
+_ENTRY_POINTS_LOADED = False
+_REPORTED_EXPRESSIONS = []
 
-@dataclass
+
+def slotted_dataclass(cls):
+    """
+    dataclass decorator whose instances have no __dict__ to reduce the
+    memory footprint of the numerous geometry primitives
+    (equivalent of dataclass(slots=True) not available before python 3.10)
+    """
+    cls = dataclass(cls)
+    names = tuple(f.name for f in fields(cls))
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in names + ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@slotted_dataclass
 class Point:
     """Cartesian coordinate of a point"""
 
@@ -19,7 +45,7 @@ class Point:
     y: float = 0.0
 
 
-@dataclass
+@slotted_dataclass
 class SplineSegment:
     """
     Spline directive as in SVG images
@@ -51,7 +77,7 @@ class SplineSegment:
     y: float = 0.0
 
 
-@dataclass
+@slotted_dataclass
 class ArrowDescription:
     """
     Position of the center and orientation of the arrow to be drawn
@@ -62,7 +88,7 @@ class ArrowDescription:
     angle: float = 0.0
 
 
-@dataclass
+@slotted_dataclass
 class Drawable:
     """
     Association of a css class to a List[Point], or List[SplineSegment],
@@ -73,7 +99,39 @@ class Drawable:
     object: Any
 
 
-def safe_eval(code: str, ctx: dict = {}):
+@functools.lru_cache(maxsize=1024)
+def compile_expression(code: str):
+    """
+    compile an expression once for all the calls of safe_eval
+
+    Args:
+        code (str): code to compile
+    Returns:
+        the code object, or None if the code is not a valid expression
+    """
+    try:
+        # ast only accept a subset of python instruction
+        # which is safer than eval
+        parse_tree = ast.parse(code, mode="eval")
+        return compile(parse_tree, filename="<string>", mode="eval")
+    except Exception:
+        return None
+
+
+@contextlib.contextmanager
+def report_expressions(reported: set):
+    """
+    report once the strings which are not expressions evaluated inside the
+    block, such as by the bricks being built, and add them to reported
+    """
+    _REPORTED_EXPRESSIONS.append(reported)
+    try:
+        yield reported
+    finally:
+        _REPORTED_EXPRESSIONS.remove(reported)
+
+
+def safe_eval(code: str, ctx: dict = {}, reported: set = None):
     """
     propose a safer alternative to eval based on ast to pre-filter possible
     instructions and limiting current variables access
@@ -81,18 +139,25 @@ def safe_eval(code: str, ctx: dict = {}):
     Args:
         code (str): code to execute
         ctx (dict): predefined variables and functions
+        reported (set): strings already reported as not being expressions,
+            to report each of them once per drawing. By default, the set
+            given to the innermost report_expressions() block
     Returns:
         resulting value of the code
     """
+    if reported is None and _REPORTED_EXPRESSIONS:
+        reported = _REPORTED_EXPRESSIONS[-1]
+    code_object = compile_expression(code)
     try:
-        # ast only accept a subset of python instruction
-        # which is safer than eval
-        parse_tree = ast.parse(code, mode="eval")
-        code_object = compile(parse_tree, filename="<string>", mode="eval")
+        if code_object is None:
+            raise SyntaxError(code)
         # eval is not safe by itself but filtered by ast
         return eval(code_object, ctx)
     except Exception:
-        log.note(f"Failed to parse '{code}' consider as normal string")
+        if reported is None or code not in reported:
+            if reported is not None:
+                reported.add(code)
+            log.note(f"Failed to parse '{code}' consider as normal string")
         return code
 
 
@@ -159,7 +224,7 @@ class Brick:
         self.ignore_start_transition = bool(kwargs.get("ignore_start_transition", False))
         self.ignore_end_transition = bool(kwargs.get("ignore_end_transition", False))
         self.is_first = bool(kwargs.get("is_first", False))
-        self.args = copy.deepcopy(kwargs)
+        self.args = kwargs
         self.symbol = None
         self.paths = []
         self.arrows = []
@@ -200,6 +265,140 @@ class Brick:
         return first_point_spline.y
 
 
+class BrickArgs(ChainMap):
+    """
+    Arguments of a brick descriptor
+
+    The arguments specific to the brick are layered over the arguments
+    shared by all the bricks of a wavelane which are never copied.
+    Modifications only apply to the arguments specific to the brick and
+    drop the geometry cached by the descriptor owning them.
+    """
+
+    def __init__(self, owner, args: dict, *shared: Mapping) -> None:
+        ChainMap.__init__(self, args, *shared)
+        self.owner = owner
+
+    def __setitem__(self, key, value) -> None:
+        ChainMap.__setitem__(self, key, value)
+        self.owner.invalidate()
+
+    def __delitem__(self, key) -> None:
+        ChainMap.__delitem__(self, key)
+        self.owner.invalidate()
+
+    def pop(self, *args):
+        self.owner.invalidate()
+        return ChainMap.pop(self, *args)
+
+    def popitem(self):
+        self.owner.invalidate()
+        return ChainMap.popitem(self)
+
+    def clear(self) -> None:
+        ChainMap.clear(self)
+        self.owner.invalidate()
+
+    def copy(self) -> dict:
+        """flatten the arguments into a new dictionary"""
+        return dict(self)
+
+
+class BrickDescriptor:
+    """
+    Lightweight representation of a brick manipulated by the filters
+
+    Only the symbol and the arguments are stored, the arguments shared
+    with other bricks are referenced and not copied. The geometry is built
+    on demand when a filter needs it (e.g. get_last_y) and is kept until
+    the symbol or the arguments are modified.
+
+    Attributes:
+        symbol (str): identification symbol of the brick
+        args (BrickArgs): arguments used to create the brick
+        repeat (int): number consecutive '.' after it for repetition
+    """
+
+    __slots__ = ["_symbol", "_brick", "args", "repeat"]
+
+    def __init__(self, symbol: str, *shared: Mapping, **kwargs) -> None:
+        self._symbol = symbol
+        self._brick = None
+        self.args = BrickArgs(self, kwargs, *shared)
+        self.repeat = 1
+
+    @property
+    def symbol(self) -> str:
+        return self._symbol
+
+    @symbol.setter
+    def symbol(self, symbol: str) -> None:
+        self._symbol = symbol
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """drop the cached geometry"""
+        self._brick = None
+
+    def build(self) -> Brick:
+        """create the brick or return the one already built"""
+        if self._brick is None:
+            self._brick = BrickFactory.create(self._symbol, **self.args)
+        return self._brick
+
+    def get_last_y(self) -> float:
+        """Get last y-coordinate of the brick"""
+        return self.build().get_last_y()
+
+    def get_first_y(self) -> float:
+        """Get first y-coordinate of the brick"""
+        return self.build().get_first_y()
+
+    def __getattr__(self, name: str):
+        # fallback on the geometry for width, height, paths, ...
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.build(), name)
+
+    def __repr__(self) -> str:
+        return f"BrickDescriptor(symbol={self._symbol!r}, repeat={self.repeat})"
+
+
+def load_plugin(module: str) -> None:
+    """import a bricks module and call its initialize() only once per process"""
+    if module in _LOADED_PLUGINS:
+        return
+    _LOADED_PLUGINS.add(module)
+    log.debug(f"Load the bricks of {module}")
+    importlib.import_module(module).initialize()
+
+
+def load_entry_points() -> None:
+    """
+    load the bricks modules of the installed packages
+
+    a package provides bricks by declaring its module in the entry points
+    of the group undulate.bricks. They are only looked for the first time
+    a symbol or a shape is not found.
+    """
+    global _ENTRY_POINTS_LOADED
+    if _ENTRY_POINTS_LOADED:
+        return
+    _ENTRY_POINTS_LOADED = True
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return
+    eps = entry_points()
+    # the selection by group is only available since python 3.10
+    if hasattr(eps, "select"):
+        eps = eps.select(group=ENTRY_POINTS_GROUP)
+    else:
+        eps = eps.get(ENTRY_POINTS_GROUP, [])
+    for ep in eps:
+        load_plugin(ep.value)
+
+
 class BrickFactory:
     """
     Create a brick from its symbol once registered
@@ -210,11 +409,36 @@ class BrickFactory:
         tags (Dict[str, List[str]]): list of categories associated to bricks
         params (Dict[str, Dict[str, Any]]): list of required parameters and their
             default for a given brick
+        cacheable (Dict[str, bool]): if the geometry of a brick only depends on
+            GEOMETRY_PARAMS and its required parameters, and can be shared
+        cache (OrderedDict[tuple, Brick]): least recently used bricks indexed by
+            their geometry key, at most cache_size of them
+        lazy (Dict[str, str]): module implementing a symbol declared but not yet
+            registered, imported on the first use of the symbol
     """
 
     funcs = {}
     tags = {}
     params = {}
+    cacheable = {}
+    cache = OrderedDict()
+    cache_size = 4096
+    lazy = {}
+    GEOMETRY = ("paths", "arrows", "polygons", "splines", "texts")
+    GEOMETRY_PARAMS = (
+        "brick_width",
+        "brick_height",
+        "slewing",
+        "first_y",
+        "last_y",
+        "ignore_start_transition",
+        "ignore_end_transition",
+        "is_first",
+        "follow_data",
+        "hide_data",
+        "y",
+        "analogue_tolerance",
+    )
 
     @staticmethod
     def register(
@@ -222,24 +446,116 @@ class BrickFactory:
         initializer: Callable,
         tags: List[str] = [],
         params: Dict[str, Any] = {},
+        cache: bool = False,
     ) -> None:
-        """register a new brick called {name} mapped to {symbol}"""
+        """
+        register a new brick called {name} mapped to {symbol}
+
+        Args:
+            cache (bool): the geometry only depends on GEOMETRY_PARAMS and
+                the parameters in params, and can be shared between bricks
+        """
         BrickFactory.funcs[symbol] = initializer
         # symbol can be tagged to later ease filtering on type
         BrickFactory.tags[symbol] = tags
         # register list of needed parameters
         BrickFactory.params[symbol] = params
+        # geometry shared between bricks with the same parameters
+        BrickFactory.cacheable[symbol] = cache
+        BrickFactory.clear_cache()
 
     @staticmethod
-    def create(symbol: str, **kwargs) -> Brick:
-        """create a brick from its symbol"""
+    def declare(module: str, symbols: Iterable[str]) -> None:
+        """declare the symbols of a module imported when one of them is used"""
+        for symbol in symbols:
+            if symbol not in BrickFactory.funcs:
+                BrickFactory.lazy[symbol] = module
+
+    @staticmethod
+    def resolve(symbol: str) -> bool:
+        """
+        check a symbol is registered, loading the module implementing it
+        if not yet done
+
+        Returns:
+            True if the symbol can be created
+        """
         if symbol not in BrickFactory.funcs:
+            module = BrickFactory.lazy.pop(symbol, None)
+            if module is not None:
+                load_plugin(module)
+            else:
+                load_entry_points()
+        return symbol in BrickFactory.funcs
+
+    @staticmethod
+    def clear_cache() -> None:
+        """drop all cached geometries"""
+        BrickFactory.cache.clear()
+
+    @staticmethod
+    def geometry_key(symbol: str, kwargs: dict):
+        """
+        identify the geometry of a brick by its symbol and the value of
+        the parameters it depends on
+
+        Returns:
+            a hashable key or None if the brick cannot be cached
+        """
+        if not BrickFactory.cacheable.get(symbol, False):
+            return None
+        names = BrickFactory.GEOMETRY_PARAMS + tuple(BrickFactory.params.get(symbol, {}))
+        key = (symbol,) + tuple(kwargs.get(name) for name in names)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @staticmethod
+    def create(symbol: str, **kwargs) -> Brick:
+        """
+        create a brick from its symbol
+
+        The geometry (paths, arrows, polygons, splines, texts) of a cached
+        brick is shared with the new one and frozen into tuples.
+        Only the arguments and the node name are bound to the new brick.
+        """
+        if not BrickFactory.resolve(symbol):
             log.fatal(log.BRICK_SYMBOL_UNDEFINED % symbol, 3)
+        key = BrickFactory.geometry_key(symbol, kwargs)
+        cached = BrickFactory.cache.get(key) if key is not None else None
+        if cached is not None:
+            BrickFactory.cache.move_to_end(key)
+            brick = copy.copy(cached)
+            brick.args = kwargs
+            brick.node_name = kwargs.get("node_name", "")
+            return brick
         init = BrickFactory.funcs[symbol]
         brick = init(**kwargs)
         brick.symbol = symbol
+        if key is not None:
+            for name in BrickFactory.GEOMETRY:
+                setattr(brick, name, tuple(getattr(brick, name)))
+            BrickFactory.cache[key] = copy.copy(brick)
+            if len(BrickFactory.cache) > BrickFactory.cache_size:
+                BrickFactory.cache.popitem(last=False)
         return brick
 
+    @staticmethod
+    def describe(symbol: str, *shared: Mapping, **kwargs) -> BrickDescriptor:
+        """
+        describe a brick from its symbol without building its geometry
+
+        Args:
+            symbol (str): identification symbol of the brick
+            shared (Mapping): arguments shared with other bricks, looked up
+                after kwargs and never modified
+        """
+        if not BrickFactory.resolve(symbol):
+            log.fatal(log.BRICK_SYMBOL_UNDEFINED % symbol, 3)
+        return BrickDescriptor(symbol, *shared, **kwargs)
+
     @staticmethod
     def get_parameters() -> Dict[str, Any]:
         """list all parameters registered"""
@@ -250,16 +566,23 @@ class BrickFactory:
 
 
 class FilterBank:
-    """List of filters to apply process a waveform"""
+    """
+    List of filters to apply process a waveform
+
+    Filters receive and return a list of BrickDescriptor so that
+    the geometry of each brick is only built once at the end
+    """
 
     filters = []
 
     @staticmethod
     def register(filter: Callable):
-        FilterBank.filters.append(filter)
+        # initializing a module twice shall not apply its filters twice
+        if filter not in FilterBank.filters:
+            FilterBank.filters.append(filter)
 
     @staticmethod
-    def apply(waveform: List[Brick]) -> List[Brick]:
+    def apply(waveform: List[BrickDescriptor]) -> List[BrickDescriptor]:
         """apply registered filters on the wavelane"""
         ans = waveform
         for filter in FilterBank.filters:
@@ -270,14 +593,19 @@ class FilterBank:
 
 
 class NodeBank:
-    """Register brick position of a given node"""
+    """
+    Register brick position of a given node
+
+    Attributes:
+        nodes (Dict[str, Point]): position of each node in the drawing
+    """
 
-    nodes = {}
+    def __init__(self) -> None:
+        self.nodes = {}
 
-    @staticmethod
-    def register(node_name: str, point: Point):
+    def register(self, node_name: str, point: Point):
         """save coordinate of a node"""
-        NodeBank.nodes[node_name] = point
+        self.nodes[node_name] = point
 
 
 class ShapeFactory:
@@ -287,19 +615,46 @@ class ShapeFactory:
     Attributes:
         funcs (Dict[str, Callable[...,str]]): initialization function to create an annotation
             from its shape
+        lazy (List[str]): modules providing shapes, imported when a shape
+            is not yet registered
     """
 
     funcs = {}
+    lazy = []
 
     @staticmethod
     def register(pattern: str, generator: Callable):
         """save coordinate of a node"""
         ShapeFactory.funcs[pattern] = generator
 
+    @staticmethod
+    def declare(module: str) -> None:
+        """declare a module providing shapes imported when a shape is used"""
+        if module not in ShapeFactory.lazy:
+            ShapeFactory.lazy.append(module)
+
+    @staticmethod
+    def resolve(pattern: str) -> bool:
+        """
+        check a pattern is registered, loading the modules providing
+        shapes if not yet done
+
+        Returns:
+            True if the pattern can be created
+        """
+        if pattern not in ShapeFactory.funcs:
+            if ShapeFactory.lazy:
+                for module in ShapeFactory.lazy:
+                    load_plugin(module)
+                ShapeFactory.lazy.clear()
+                return ShapeFactory.resolve(pattern)
+            load_entry_points()
+        return pattern in ShapeFactory.funcs
+
     @staticmethod
     def create(pattern: str, renderer, **kwargs) -> str:
         """create an annotation from a pattern"""
-        if pattern not in ShapeFactory.funcs:
+        if not ShapeFactory.resolve(pattern):
             log.fatal(log.ANNOTATION_PATTERN_UNDEFINED % pattern, 3)
         generator = ShapeFactory.funcs[pattern]
         return generator(renderer, pattern, **kwargs)
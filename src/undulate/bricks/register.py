@@ -184,7 +184,10 @@ def initialize() -> None:
         },
     )
     BrickFactory.register(
-        ":", FieldMid, tags=["reg"], params={"data": "", "style": "", "type": None}
+        ":",
+        FieldMid,
+        tags=["reg"],
+        params={"data": "", "style": "", "type": None},
     )
     BrickFactory.register(
         "]",
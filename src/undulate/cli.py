@@ -4,26 +4,226 @@
 Command line interface to draw your waveforms
 """
 
+import time
+
+# first to measure the startup
+_IMPORT_START = time.perf_counter()
+
+import io
 import os
+import sys
+import glob
 import json
+import atexit
+import marshal
+import hashlib
 import argparse
-import traceback
+import functools
 import importlib
+import contextlib
 
+import undulate
 import undulate.logger as log
 import undulate.skin as skin
 import undulate.parsers.register as register
 
-from pprint import pprint
-from typing import Any, Tuple
+from typing import Any, List, Optional, Tuple
 
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "plugins.json")
+CACHE_SIZE = 64 * 1024 * 1024
+PARSED_ENTRIES = 128
+WATCH_INTERVAL = 0.1
+WATCH_DEBOUNCE = 0.05
+_CONFIG = None
+_PARSED = {}
+_PHASES = [("import undulate.cli", None)]
+_LOADED_BRICKS = set()
+_LOADED_STYLES = set()
+
+
+# ==== Startup Profile ====
+@contextlib.contextmanager
+def startup_phase(name: str):
+    """measure the time spent in a phase of the startup"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _PHASES.append((name, time.perf_counter() - start))
+
+
+def startup_report() -> str:
+    """time spent in each phase since the import of the cli"""
+    lines = ["startup profile:"]
+    for name, elapsed in _PHASES:
+        lines.append(f"{elapsed * 1000:9.2f}ms  {name}")
+    total = time.perf_counter() - _IMPORT_START
+    lines.append(f"{total * 1000:9.2f}ms  total since the import of undulate.cli")
+    lines.append(f"{len(sys.modules):9d}    modules imported")
+    return "\n".join(lines)
+
+
+def load_config() -> dict:
+    """read the plugins configuration file only once per process"""
+    global _CONFIG
+    if _CONFIG is None:
+        with open(CONFIG_FILE, "rt+") as fp:
+            _CONFIG = json.load(fp)
+    return _CONFIG
+
+
+def load_bricks() -> None:
+    """
+    register the bricks modules only once per process
+
+    a module is given by its name to be imported and initialized at once,
+    or by an object declaring its symbols or its shapes to be imported on
+    the first use of one of them:
+
+        {"module": "undulate.bricks.analogue", "symbols": ["m", "M"]}
+        {"module": "undulate.bricks.shape", "shapes": true}
+    """
+    from undulate.bricks.generic import BrickFactory, ShapeFactory, load_plugin
+
+    for plugin in load_config().get("bricks", []):
+        if isinstance(plugin, str):
+            plugin = {"module": plugin}
+        brick_module = plugin["module"]
+        if brick_module in _LOADED_BRICKS:
+            continue
+        if plugin.get("symbols"):
+            BrickFactory.declare(brick_module, plugin["symbols"])
+        if plugin.get("shapes"):
+            ShapeFactory.declare(brick_module)
+        if not plugin.get("symbols") and not plugin.get("shapes"):
+            load_plugin(brick_module)
+        _LOADED_BRICKS.add(brick_module)
+
+
+def load_style(filepath: str) -> None:
+    """overload the default style with a css file only once per process"""
+    if filepath is None or filepath in _LOADED_STYLES:
+        return
+    skin.update_style(filepath)
+    _LOADED_STYLES.add(filepath)
+
+
+# ==== Parse Cache ====
+def default_cache_dir() -> str:
+    """
+    directory of the parsed files given by $UNDULATE_CACHE_DIR,
+    by default $XDG_CACHE_HOME/undulate or ~/.cache/undulate
+    """
+    if os.environ.get("UNDULATE_CACHE_DIR"):
+        return os.environ["UNDULATE_CACHE_DIR"]
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(root, "undulate")
+
+
+@functools.lru_cache(maxsize=None)
+def undulate_version() -> str:
+    """
+    version of the installed package, or a stamp of the sources when
+    undulate is not installed
+    """
+    try:
+        from importlib.metadata import version
+
+        return version("undulate")
+    except Exception:
+        pattern = os.path.join(os.path.dirname(__file__), "**", "*.*")
+        stamps = sorted(
+            f"{path}:{os.stat(path).st_mtime_ns}"
+            for path in glob.glob(pattern, recursive=True)
+        )
+        return "dev+" + hashlib.sha256("\n".join(stamps).encode()).hexdigest()[:12]
+
+
+def cache_key(content: bytes, parser) -> str:
+    """
+    identify the result of a parser on the content of a file
+
+    the version of undulate and the state of the parser module are part of
+    the key so that an upgrade or an updated parser never reuses an outdated
+    result. The version is the constant of the package rather than the one
+    of importlib.metadata, which alone would double the startup time. The
+    version of python and of marshal are part of it too as the format of
+    marshal can change between them.
+    """
+    stat = os.stat(parser.__file__)
+    key = hashlib.sha256(content)
+    key.update(f"\0{undulate.__version__}".encode())
+    key.update(f"\0{sys.version_info[:2]}\0{marshal.version}".encode())
+    key.update(f"\0{parser.__name__}\0{stat.st_mtime_ns}\0{stat.st_size}".encode())
+    return key.hexdigest()
+
+
+def cache_load(cache_dir: str, key: str) -> Optional[Any]:
+    """
+    read a parsed file from the cache
+
+    Returns:
+        the result of the parser or None if not in the cache
+    """
+    path = os.path.join(cache_dir, f"{key}.marshal")
+    try:
+        with open(path, "rb") as fp:
+            ans = marshal.load(fp)
+        # most recently used entries are evicted last
+        os.utime(path)
+        return ans
+    except Exception:
+        return None
+
+
+def cache_store(
+    cache_dir: str, key: str, data: bytes, max_size: int = CACHE_SIZE
+) -> None:
+    """
+    write a parsed file, serialized by marshal, into the cache and evict the
+    least recently used entries when the cache is larger than max_size bytes
+    """
+    import tempfile
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_path, os.path.join(cache_dir, f"{key}.marshal"))
+        entries = [
+            entry for entry in os.scandir(cache_dir) if entry.name.endswith(".marshal")
+        ]
+        entries = sorted((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries)
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            os.remove(path)
+            total -= size
+    except OSError as e:
+        log.debug(f"Cannot cache the parsed file: {e}")
+
 
 # ==== Parser Selection ====
-def parse(filepath: str) -> Tuple[bool, Any]:
+def load_parser(extension: str):
+    """parser module of the files with the given extension"""
+    allowed_extensions = load_config().get("extensions", {})
+    if extension not in allowed_extensions:
+        log.fatal(log.UNSUPPORTED_FORMAT % log.list_vars(allowed_extensions))
+    return importlib.import_module(allowed_extensions.get(extension))
+
+
+def parse(filepath: str, cache_dir: Optional[str] = None) -> Tuple[bool, Any]:
     """
     parse the input file into a compatible dict for processing
+
+    Args:
+        filepath (str): path to the input file
+        cache_dir (str): directory caching the parsed files, None to disable it
     """
     # file existence
     if filepath is None:
@@ -31,15 +231,157 @@ def parse(filepath: str) -> Tuple[bool, Any]:
     if not os.path.exists(filepath):
         log.fatal(log.FILE_NOT_FOUND % filepath)
     _, ext = os.path.splitext(filepath)
-    # load config file
-    with open(CONFIG_FILE, "rt+") as fp:
-        config = json.load(fp)
-        allowed_extensions = config.get("extensions", {})
-    # call appropriate parser
-    if ext[1:] not in allowed_extensions:
-        log.fatal(log.UNSUPPORTED_FORMAT % log.list_vars(allowed_extensions))
-    parser = importlib.import_module(allowed_extensions.get(ext[1:]))
-    return parser.parse(filepath)
+    parser = load_parser(ext[1:])
+    if cache_dir is None:
+        return parser.parse(filepath)
+    # unchanged files are read from the cache
+    with open(filepath, "rb") as fp:
+        key = cache_key(fp.read(), parser)
+    # a long-lived process keeps the recent files in memory, serialized
+    # to give a fresh object to the renderer at each call
+    if key in _PARSED:
+        cached = marshal.loads(_PARSED[key])
+    else:
+        cached = cache_load(cache_dir, key)
+    if cached is not None:
+        ans, warnings = cached
+        # inform as if the file was parsed
+        for msg in warnings:
+            log.warning(msg)
+    else:
+        with log.record_warnings() as warnings:
+            ans = parser.parse(filepath)
+    if key not in _PARSED:
+        try:
+            data = marshal.dumps((ans, warnings))
+        except ValueError:
+            # values not supported by marshal (e.g. dates in yaml) are not cached
+            return ans
+        if cached is None:
+            cache_store(cache_dir, key, data)
+        _PARSED[key] = data
+        if len(_PARSED) > PARSED_ENTRIES:
+            del _PARSED[next(iter(_PARSED))]
+    return ans
+
+
+# ==== Incremental Rendering ====
+def default_output(input_path: str, engine_info: dict) -> str:
+    """path of the generated file when no output is given"""
+    file_name, _ = os.path.splitext(os.path.basename(input_path))
+    return f"./{file_name}.{engine_info.get('extension')}"
+
+
+def manifest_path(output_path: str) -> str:
+    """path of the manifest recording how an output file was generated"""
+    folder, name = os.path.split(output_path)
+    return os.path.join(folder, f".{name}.undulate")
+
+
+def render_manifest(
+    input_path: str, rendering_engine: str, is_reg: bool, dpi: float, eol: str
+) -> dict:
+    """
+    describe everything the generated file depends on: the input file,
+    the style (default.css updated by --style), the options, and the version
+    """
+    with open(input_path, "rb") as fp:
+        input_hash = hashlib.sha256(fp.read()).hexdigest()
+    style = json.dumps(skin.default_style(), sort_keys=True, default=repr)
+    return {
+        "input": input_hash,
+        "style": hashlib.sha256(style.encode()).hexdigest(),
+        "engine": rendering_engine,
+        "is_reg": is_reg,
+        "dpi": dpi,
+        "eol": eol,
+        "version": undulate_version(),
+    }
+
+
+def is_up_to_date(output_path: str, manifest: dict) -> bool:
+    """the output file exists and was generated from the same manifest"""
+    if not os.path.exists(output_path):
+        return False
+    try:
+        with open(manifest_path(output_path), "rt") as fp:
+            return json.load(fp) == manifest
+    except (OSError, ValueError):
+        return False
+
+
+def write_manifest(output_path: str, manifest: dict) -> None:
+    """record how the output file has been generated"""
+    try:
+        with open(manifest_path(output_path), "wt") as fp:
+            json.dump(manifest, fp, indent=2)
+    except OSError as e:
+        log.debug(f"Cannot write the manifest of {output_path}: {e}")
+
+
+# ==== Rendering ====
+def load_engine_info(rendering_engine: str) -> dict:
+    """description of a supported rendering engine in the plugins configuration"""
+    rendering_engines = load_config().get("engines", {})
+    if rendering_engine.lower() not in rendering_engines:
+        log.fatal(log.UNSUPPORTED_ENGINE % log.list_vars(rendering_engines))
+    return rendering_engines.get(rendering_engine)
+
+
+def file_engines() -> List[str]:
+    """rendering engines generating a file"""
+    return [
+        name
+        for name, info in load_config().get("engines", {}).items()
+        if info.get("module") and info.get("extension")
+    ]
+
+
+def load_renderer(rendering_engine: str, dpi: float):
+    """new renderer of the given engine"""
+    engine_info = load_engine_info(rendering_engine)
+    engine = importlib.import_module(engine_info.get("module"))
+    renderer = getattr(engine, engine_info.get("classname"))
+    engine_params = {
+        k: v for k, v in engine_info.items() if k not in ["module", "classname"]
+    }
+    if "dpi" in engine_params:
+        engine_params["dpi"] = dpi
+    return renderer(**engine_params)
+
+
+def render(
+    obj: dict, engine: str = "svg", is_reg: bool = False, dpi: float = 150.0, **opts
+) -> bytes:
+    """
+    render a parsed description in memory instead of a file
+
+    Args:
+        obj (dict): description as returned by a parser
+        engine (str): rendering engine generating a file (svg, cairo-png, ...)
+        is_reg (bool): obj is a register description
+        dpi (float): resolution of the image for png export
+        opts: parameters of the drawing such as stylesheet, brick_width, eol
+    Returns:
+        the content of the generated file
+    """
+    if engine not in file_engines():
+        log.fatal(log.UNSUPPORTED_ENGINE % log.list_vars(file_engines()))
+    if is_reg:
+        _, obj = register.convert(obj)
+    load_bricks()
+    renderer = load_renderer(engine, dpi)
+    opts.setdefault("brick_height", 50 if is_reg else 20)
+    opts.setdefault("brick_width", 28 if is_reg else 40)
+    buffer = io.BytesIO()
+    # the svg renderer writes text
+    if renderer.engine == skin.Engine.SVG:
+        output = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+    else:
+        output = buffer
+    renderer.draw(obj, is_reg=is_reg, output=output, **opts)
+    output.flush()
+    return buffer.getvalue()
 
 
 def process(
@@ -49,61 +391,392 @@ def process(
     is_reg: bool,
     dpi: float,
     eol: str,
-) -> None:
-    # load config file
-    with open(CONFIG_FILE, "rt+") as fp:
-        config = json.load(fp)
-        bricks_modules = config.get("bricks", [])
-        rendering_engines = config.get("engines", {})
-    # supported rendering engine
-    if rendering_engine.lower() not in rendering_engines:
-        log.fatal(log.UNSUPPORTED_ENGINE % log.list_vars(rendering_engines))
+    cache_dir: Optional[str] = None,
+    incremental: bool = False,
+    stylesheet: Optional[dict] = None,
+) -> bool:
+    """
+    render an input file with the given engine
+
+    Args:
+        cache_dir (str): directory caching the parsed files, None to disable it
+        incremental (bool): skip the rendering if the output file is up to date
+        stylesheet (dict): css rules of the drawing, by default the global style
+    Returns:
+        False if the rendering was skipped, True otherwise
+    """
+    import traceback
+
+    engine_info = load_engine_info(rendering_engine)
+    # skip the rendering when nothing changed since the last one
+    manifest = None
+    if (
+        incremental
+        and engine_info.get("module")
+        and engine_info.get("extension")
+        and input_path is not None
+        and os.path.exists(input_path)
+    ):
+        target = output_path or default_output(input_path, engine_info)
+        manifest = render_manifest(input_path, rendering_engine, is_reg, dpi, eol)
+        if is_up_to_date(target, manifest):
+            log.note(log.OUTPUT_UP_TO_DATE % target)
+            return False
     # check the input file
-    _, obj = parse(input_path)
+    with startup_phase("parse input"):
+        _, obj = parse(input_path, cache_dir)
     # convert register description into wavelane
     if is_reg:
         _, obj = register.convert(obj)
     # for debug purpose
     if rendering_engine == "json":
+        from pprint import pprint
+
         pprint(obj)
         exit(0)
     # load the bricks
-    for brick_module in bricks_modules:
-        mod = importlib.import_module(brick_module)
-        mod.initialize()
-    # load the renderering engine
-    engine_info = rendering_engines.get(rendering_engine)
-    engine = importlib.import_module(engine_info.get("module"))
-    renderer = getattr(engine, engine_info.get("classname"))
-    engine_params = {
-        k: v for k, v in engine_info.items() if k not in ["module", "classname"]
-    }
-    if "dpi" in engine_params:
-        engine_params["dpi"] = dpi
-    renderer = renderer(**engine_params)
+    with startup_phase("load bricks"):
+        load_bricks()
+    with startup_phase("load renderer"):
+        renderer = load_renderer(rendering_engine, dpi)
     # default output file
     if output_path is None:
-        file_name, ext = os.path.splitext(input_path)
-        file_name = os.path.basename(file_name)
-        ext = engine_info.get("extension")
-        output_path = f"./{file_name}.{ext}"
+        output_path = default_output(input_path, engine_info)
         log.warning(log.FILE_NO_OUTPUT % output_path)
     try:
-        renderer.draw(
-            obj,
-            brick_height=(50 if is_reg else 20),
-            brick_width=(28 if is_reg else 40),
-            is_reg=is_reg,
-            filename=output_path,
-            eol=eol,
-        )
+        with startup_phase("draw"):
+            renderer.draw(
+                obj,
+                brick_height=(50 if is_reg else 20),
+                brick_width=(28 if is_reg else 40),
+                is_reg=is_reg,
+                filename=output_path,
+                eol=eol,
+                stylesheet=stylesheet,
+            )
     except Exception as e:
         traceback.print_tb(e.__traceback__)
-        print(e)
-        exit(3)
+        log.fatal(str(e), 3)
+    if manifest is not None:
+        write_manifest(output_path, manifest)
+    return True
+
+
+# ==== Batch Processing ====
+def batch_inputs(patterns: List[str]) -> List[str]:
+    """
+    expand the glob patterns into the list of input files
+
+    a pattern matching no file is kept as is to be reported as not found
+    """
+    inputs = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        inputs.extend(match for match in matches if match not in inputs)
+    return inputs
+
+
+def batch_outputs(inputs: List[str], output_dir: str, rendering_engine: str) -> dict:
+    """
+    path of the file generated in the output directory for each input
+
+    inputs sharing the same name keep their directory relative to their
+    common parent, and their extension as in '<name>-<ext>' when needed,
+    so that each of them has its own output
+
+    Returns:
+        the output path of each input path, in the order of the inputs
+    """
+    engine_info = load_config().get("engines", {}).get(rendering_engine.lower(), {})
+    ext = engine_info.get("extension")
+    stems = {}
+    for input_path in inputs:
+        file_name, _ = os.path.splitext(os.path.basename(input_path))
+        stems.setdefault(file_name, []).append(input_path)
+    names = {}
+    for file_name, paths in stems.items():
+        if len(paths) == 1:
+            names[paths[0]] = file_name
+            continue
+        common = os.path.commonpath(
+            [os.path.dirname(os.path.abspath(path)) for path in paths]
+        )
+        relatives = {
+            path: os.path.splitext(os.path.relpath(os.path.abspath(path), common))
+            for path in paths
+        }
+        roots = [root for root, _ in relatives.values()]
+        for path, (root, source_ext) in relatives.items():
+            names[path] = root if roots.count(root) == 1 else f"{root}-{source_ext[1:]}"
+    outputs, owners = {}, {}
+    for input_path in inputs:
+        name = names[input_path]
+        output_path = os.path.join(output_dir, f"{name}.{ext}" if ext else name)
+        owner = owners.setdefault(os.path.normcase(output_path), input_path)
+        if owner != input_path:
+            log.fatal(log.BATCH_OUTPUT_CONFLICT % (owner, input_path, output_path))
+        outputs[input_path] = output_path
+    return outputs
+
+
+def _batch_initializer(style: Optional[str]) -> None:
+    """load once per worker what is common to all files"""
+    load_bricks()
+    load_style(style)
+
+
+def _batch_job(
+    input_path: str,
+    output_path: str,
+    rendering_engine: str,
+    is_reg: bool,
+    dpi: float,
+    eol: str,
+    cache_dir: Optional[str] = None,
+    incremental: bool = False,
+) -> Tuple[str, float, Optional[str], bool]:
+    """
+    process a single file of a batch without stopping the interpreter
+
+    Returns:
+        the input path, the processing time in seconds, the error
+        message or None on success, and if the file was rendered
+    """
+    start, error, rendered = time.perf_counter(), None, False
+    try:
+        rendered = process(
+            input_path,
+            output_path,
+            rendering_engine,
+            is_reg,
+            dpi,
+            eol,
+            cache_dir,
+            incremental,
+        )
+    except log.FatalError as e:
+        error = e.msg
+    except SystemExit as e:
+        if e.code:
+            error = f"exit with code {e.code}"
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"
+    return input_path, time.perf_counter() - start, error, rendered
+
+
+def batch_process(
+    patterns: List[str],
+    output_dir: str,
+    rendering_engine: str,
+    is_reg: bool,
+    dpi: float,
+    eol: str,
+    style: Optional[str] = None,
+    jobs: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    incremental: bool = False,
+) -> int:
+    """
+    render many input files into an output directory
+
+    plugins and style are loaded once per worker and the files are spread
+    over a pool of processes. A failing file is reported and does not stop
+    the processing of the others.
+
+    Args:
+        patterns (List[str]): input files or glob patterns
+        output_dir (str): directory of the generated files
+        jobs (int): number of processes, by default the number of cpus.
+            With one job, files are processed in the current process.
+        cache_dir (str): directory caching the parsed files, None to disable it
+        incremental (bool): skip the files whose output is up to date
+    Returns:
+        the number of files that failed
+    """
+    import concurrent.futures
+
+    output_dir = output_dir or "."
+    os.makedirs(output_dir, exist_ok=True)
+    inputs = batch_inputs(patterns)
+    outputs = batch_outputs(inputs, output_dir, rendering_engine)
+    for output_path in set(map(os.path.dirname, outputs.values())):
+        os.makedirs(output_path, exist_ok=True)
+    tasks = [
+        (
+            input_path,
+            outputs[input_path],
+            rendering_engine,
+            is_reg,
+            dpi,
+            eol,
+            cache_dir,
+            incremental,
+        )
+        for input_path in inputs
+    ]
+    start, failures, skipped = time.perf_counter(), 0, 0
+
+    def _report(
+        input_path: str, elapsed: float, error: Optional[str], rendered: bool
+    ) -> None:
+        nonlocal failures, skipped
+        if error is None and not rendered:
+            skipped += 1
+            print(f"{elapsed:8.3f}s  {input_path} (up to date)")
+        elif error is None:
+            print(f"{elapsed:8.3f}s  {input_path}")
+        else:
+            failures += 1
+            print(f"{elapsed:8.3f}s  {input_path} FAILED: {error}")
+
+    if jobs == 1:
+        _batch_initializer(style)
+        for task in tasks:
+            _report(*_batch_job(*task))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, initializer=_batch_initializer, initargs=(style,)
+        ) as pool:
+            futures = [pool.submit(_batch_job, *task) for task in tasks]
+            for future in concurrent.futures.as_completed(futures):
+                _report(*future.result())
+    print(
+        f"{len(tasks) - failures - skipped}/{len(tasks)} files rendered "
+        + (f"({skipped} up to date) " if skipped else "")
+        + f"in {time.perf_counter() - start:.3f}s"
+    )
+    return failures
+
+
+# ==== Watch Mode ====
+def watch_snapshot(paths: List[str]) -> dict:
+    """modification time and size of each path, None for a missing file"""
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            snapshot[path] = None
+    return snapshot
+
+
+def watch(
+    patterns: List[str],
+    output_path: Optional[str],
+    rendering_engine: str,
+    is_reg: bool,
+    dpi: float,
+    eol: str,
+    style: Optional[str] = None,
+    batch: bool = False,
+    cache_dir: Optional[str] = None,
+    incremental: bool = False,
+    interval: float = WATCH_INTERVAL,
+    debounce: float = WATCH_DEBOUNCE,
+) -> None:
+    """
+    render the input files again each time they or the style change
+
+    plugins, modules and the style are loaded once and the process lives
+    until interrupted. Files are polled every interval seconds and rendered
+    once they did not change for debounce seconds, so that an editor saving
+    a file in several steps triggers a single rendering.
+
+    Args:
+        patterns (List[str]): input files or glob patterns
+        output_path (str): output file, or directory of the generated files
+            in batch mode
+        style (str): css file overloading the default style
+        batch (bool): render the files as in batch mode
+        interval (float): polling period in seconds
+        debounce (float): time in seconds the files shall be stable
+    """
+    if not all(patterns):
+        log.fatal(log.FILE_NOT_GIVEN)
+    if batch:
+        output_path = output_path or "."
+        os.makedirs(output_path, exist_ok=True)
+
+    def _render(inputs: List[str], incremental: bool = False) -> None:
+        outputs = {}
+        if batch:
+            try:
+                outputs = batch_outputs(
+                    batch_inputs(patterns), output_path, rendering_engine
+                )
+            except log.FatalError as e:
+                print(f"FAILED: {e.msg}")
+                return
+            for directory in set(map(os.path.dirname, outputs.values())):
+                os.makedirs(directory, exist_ok=True)
+        for input_path in inputs:
+            _, elapsed, error, rendered = _batch_job(
+                input_path,
+                outputs.get(input_path, output_path),
+                rendering_engine,
+                is_reg,
+                dpi,
+                eol,
+                cache_dir,
+                incremental,
+            )
+            if error is not None:
+                print(f"{elapsed:8.3f}s  {input_path} FAILED: {error}")
+            elif rendered:
+                print(f"{elapsed:8.3f}s  {input_path}")
+
+    def _reload_style() -> None:
+        skin.reset_style()
+        _LOADED_STYLES.clear()
+        try:
+            load_style(style)
+        except SystemExit:
+            print(f"{style} is not a valid stylesheet")
+
+    def _watched() -> List[str]:
+        # patterns are expanded again to follow new files
+        inputs = batch_inputs(patterns)
+        return inputs + [style] if style else inputs
+
+    load_bricks()
+    _reload_style()
+    snapshot = watch_snapshot(_watched())
+    _render([path for path in snapshot if path != style], incremental)
+    print(log.WATCHING % log.list_vars(snapshot.keys()), end="")
+    try:
+        while True:
+            time.sleep(interval)
+            current = watch_snapshot(_watched())
+            if current == snapshot:
+                continue
+            # wait for the files to settle down
+            while True:
+                time.sleep(debounce)
+                settled = watch_snapshot(_watched())
+                if settled == current:
+                    break
+                current = settled
+            changed = [
+                path
+                for path, stat in current.items()
+                if stat is not None and snapshot.get(path) != stat
+            ]
+            snapshot = current
+            if style in changed:
+                _reload_style()
+                changed = list(current.keys())
+            _render([path for path in changed if path != style and current[path]])
+    except KeyboardInterrupt:
+        pass
 
 
 def main():
+    # long-lived render server
+    if sys.argv[1:2] == ["serve"]:
+        import undulate.server
+
+        return undulate.server.main(sys.argv[2:])
     parser = argparse.ArgumentParser(description="waveform generator from textual format")
     parser.add_argument(
         "-i", "--input", help="path to the input text file", default=None, type=str
@@ -130,11 +803,87 @@ def main():
     parser.add_argument(
         "--eol", help="define the end of line in term renderer", default="\n", type=str
     )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        help="input files or glob patterns rendered into the output directory",
+        nargs="+",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes in batch mode (default: number of cpus)",
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="skip the rendering when the output is up to date",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        help="render again the input files each time they or the style change",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="do not cache the parsed input files (cached by default in "
+        "$UNDULATE_CACHE_DIR or ~/.cache/undulate)",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--profile-startup",
+        help="report the time spent in each phase of the startup",
+        action="store_true",
+        default=False,
+    )
     parser.add_argument("mangled_input", nargs="?", default=None, type=str)
-    cli_args = parser.parse_args()
+    with startup_phase("parse arguments"):
+        cli_args = parser.parse_args()
+    if cli_args.profile_startup:
+        atexit.register(lambda: print(startup_report(), file=sys.stderr))
+    eol = cli_args.eol.replace("cr", "\r").replace("lf", "\n")
+    cache_dir = None if cli_args.no_cache else default_cache_dir()
+    # live rendering while editing
+    if cli_args.watch:
+        watch(
+            cli_args.batch or [cli_args.input or cli_args.mangled_input],
+            cli_args.output,
+            cli_args.format,
+            cli_args.is_reg,
+            cli_args.dpi,
+            eol,
+            style=cli_args.style,
+            batch=cli_args.batch is not None,
+            cache_dir=cache_dir,
+            incremental=cli_args.incremental,
+        )
+        exit(0)
+    # render many files at once
+    if cli_args.batch is not None:
+        failures = batch_process(
+            cli_args.batch,
+            cli_args.output,
+            cli_args.format,
+            cli_args.is_reg,
+            cli_args.dpi,
+            eol,
+            style=cli_args.style,
+            jobs=cli_args.jobs,
+            cache_dir=cache_dir,
+            incremental=cli_args.incremental,
+        )
+        exit(1 if failures else 0)
     # update default style
-    if cli_args.style is not None:
-        skin.update_style(cli_args.style)
+    with startup_phase("load style"):
+        load_style(cli_args.style)
     # process following data
     process(
         cli_args.input or cli_args.mangled_input,
@@ -142,9 +891,13 @@ def main():
         cli_args.format,
         cli_args.is_reg,
         cli_args.dpi,
-        cli_args.eol.replace("cr", "\r").replace("lf", "\n"),
+        eol,
+        cache_dir,
+        cli_args.incremental,
     )
 
 
+_PHASES[0] = ("import undulate.cli", time.perf_counter() - _IMPORT_START)
+
 if __name__ == "__main__":
     main()
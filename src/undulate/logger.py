@@ -1,15 +1,61 @@
 import os
 import sys
 import json
-import logging
-import logging.config
+import contextlib
 from typing import Iterable
 
 # ==== configure log utility ====
 conf_path = os.path.join(os.path.dirname(__file__), "logging.json")
 conf_path = conf_path.replace("\\", "/")
 with open(conf_path, "r+") as fp:
-    logging.config.dictConfig(json.load(fp))
+    _LOG_CONFIG = json.load(fp)
+# logging is only imported and configured to show the first message. Until
+# then, nothing can have changed the levels and messages are filtered by the
+# level of the root logger in logging.json. The levels are those of logging.
+DEBUG, INFO, WARNING, ERROR, CRITICAL = 10, 20, 30, 40, 50
+_LEVEL = _LOG_CONFIG.get("root", {}).get("level", WARNING)
+if isinstance(_LEVEL, str):
+    # unknown names are left to logging which reports them
+    _LEVEL = globals().get(_LEVEL.upper(), 0)
+_CONFIGURED = False
+
+
+def configure() -> None:
+    """
+    configure the log utility from logging.json only once
+
+    when the application imported logging before, the level and the handlers
+    of its root logger are kept and its loggers stay enabled
+    """
+    global _CONFIGURED
+    if _CONFIGURED:
+        return
+    _CONFIGURED = True
+    # the application can only have set the level of the root logger if it
+    # imported logging before the first message
+    application_logging = "logging" in sys.modules
+    import logging
+    import logging.config
+
+    root = logging.getLogger()
+    root_level, root_handlers = root.level, list(root.handlers)
+    logging.config.dictConfig({**_LOG_CONFIG, "disable_existing_loggers": False})
+    for handler in root_handlers:
+        root.addHandler(handler)
+    if application_logging:
+        root.setLevel(root_level)
+
+
+def _log(level: int, msg) -> None:
+    # levels can only have been changed once logging is imported
+    if level < _LEVEL and not _CONFIGURED and "logging" not in sys.modules:
+        return
+    configure()
+    import logging
+
+    if logging.getLogger().isEnabledFor(level):
+        logging.log(level, msg)
+
 
 YAML_IMPORT = "To read yaml file PyYAML is required. Run 'pip install pyyaml'"
 TOML_IMPORT = "To read toml file toml is required. Run 'pip install toml'"
@@ -19,7 +65,11 @@ FILE_NOT_FOUND = "File '%s' is not found"
 FILE_NOT_GIVEN = "An input file shall be given"
 FILE_EMPTY = "The input file shall not be empty"
 FILE_NO_OUTPUT = "No output file given. Generated at %s"
+BATCH_OUTPUT_CONFLICT = "Files '%s' and '%s' would both be rendered into '%s'"
+OUTPUT_UP_TO_DATE = "Output of '%s' is up to date"
+WATCHING = "Watching the following files (Ctrl+C to stop):\n%s"
 SYNTAX_ERROR = "Parsing Error detected: %s at line %d"
+SYNTAX_ERROR_AT = "Parsing Error detected: %s at line %d column %d"
 UNSUPPORTED_FORMAT = (
     "This file format is not yet supported\n" "choose one of the following:\n %s"
 )
@@ -36,26 +86,56 @@ ANNOTATION_PATTERN_UNDEFINED = "The pattern '%s' is not defined"
 FROM_TO_UNKNOWN_FORMAT = "In field from/to '%s' cannot be parsed"
 
 
+class FatalError(SystemExit):
+    """
+    Raised by fatal() to stop the processing of the current file
+
+    As a SystemExit, it terminates the interpreter with the error code
+    when not caught, while batch processing can catch it and continue
+    with the next file.
+    """
+
+    def __init__(self, msg: str, num: int = 1):
+        SystemExit.__init__(self, num)
+        self.msg = msg
+
+
+_RECORDED_WARNINGS = []
+
+
+@contextlib.contextmanager
+def record_warnings():
+    """collect the messages given to warning() inside the block"""
+    records = []
+    _RECORDED_WARNINGS.append(records)
+    try:
+        yield records
+    finally:
+        _RECORDED_WARNINGS.remove(records)
+
+
 def list_vars(values: Iterable) -> str:
     return "".join(("\t- %s\n" % value for value in values))
 
 
 def debug(msg):
-    logging.debug(msg)
+    _log(DEBUG, msg)
 
 
 def note(msg):
-    logging.info(msg)
+    _log(INFO, msg)
 
 
 def warning(msg):
-    logging.warning(msg)
+    for records in _RECORDED_WARNINGS:
+        records.append(msg)
+    _log(WARNING, msg)
 
 
 def error(msg):
-    logging.error(msg)
+    _log(ERROR, msg)
 
 
 def fatal(msg, num: int = 1):
-    logging.critical(msg)
-    sys.exit(num)
+    _log(CRITICAL, msg)
+    raise FatalError(msg, num)
@@ -1,32 +1,10 @@
 import re
 import json
+import itertools
 
 import undulate.logger as log
 
-from typing import Dict, Tuple
-
-# counter to have distinct spacer id
-SPACER_COUNT = 0
-
-
-def _number_convert(match):
-    """
-    Convert number with an explicit base
-    to a decimal integer value:
-    - 0x0000 -> hexadecimal
-    - 16'h0000 -> hexadecimal
-    - 0b0000 -> binary
-    - 3'b000 -> binary
-    - otherwise -> decimal
-    """
-    prefix, base, number = match.groups()
-    if prefix is not None:
-        return str(match.group(0))
-    if base in "xh":
-        return str(int(number, 16))
-    if base == "b":
-        return str(int(number, 2))
-    return str(int(number, 10))
+from typing import Dict, Iterator, Tuple
 
 
 def _make_signal_unique(signal_name: str, db: dict) -> str:
@@ -41,22 +19,24 @@ def _make_signal_unique(signal_name: str, db: dict) -> str:
     return new_name
 
 
-def _parse_wavelane(wavelane: dict):
+def _parse_wavelane(wavelane: dict, spacers: Iterator[int]):
     """
     Normalize the the wavelane name and if no name is given
     the function consider it is a spacer
+
+    Args:
+        wavelane (dict): description of the signal
+        spacers (Iterator[int]): counter of the file to have distinct spacer id
     """
-    global SPACER_COUNT
     _name = wavelane.get("name", "").strip()
     if "name" in wavelane:
         del wavelane["name"]
     if not _name:
-        SPACER_COUNT += 1
-        _name = "spacer_%f" % SPACER_COUNT
+        _name = "spacer_%f" % next(spacers)
     return (_name, wavelane)
 
 
-def _parse_group(wavegroup: list):
+def _parse_group(wavegroup: list, spacers: Iterator[int]):
     """
     Convert traditionnal group of wavedrom into
     the new structure
@@ -67,66 +47,191 @@ def _parse_group(wavegroup: list):
         log.fatal(log.GROUP_MISSING_NAME)
     for _, wavelane in enumerate(wavegroup[1:]):
         if isinstance(wavelane, dict):
-            n, wave = _parse_wavelane(wavelane)
+            n, wave = _parse_wavelane(wavelane, spacers)
         if isinstance(wavelane, list):
-            n, wave = _parse_group(wavelane)
+            n, wave = _parse_group(wavelane, spacers)
         ans[n] = wave
     return (_name, ans)
 
 
-def _prune_json(filepath: str) -> str:
+class _Parser:
     """
-    Assume the file exists and:
-    - remove comments
-    - replace single quotes by double quotes around string
-    - remove final extra comma
-    - parse numbers
+    Single pass parser of the relaxed json dialect of WaveDrom:
+
+    - // comments until the end of the line
+    - keys without quotes
+    - strings between single quotes
+    - extra comma at the end of objects and arrays
+    - numbers with an explicit base (0x1F, 0b101, 0d12, 8'hFF, 3'b101)
+
+    Objects and arrays written in strict json are decoded at once
+    by the json module, only the others are parsed token by token.
+
+    Args:
+        content (str): text to parse
     """
-    with open(filepath, "r+") as fp:
-        content = " ".join(
-            [
-                line[: line.find("//")] if line.find("//") >= 0 else line
-                for line in fp.readlines()
-            ]
-        )
-    if not content:
-        log.fatal(log.FILE_EMPTY)
-    # add double quotes around strings
-    content = re.sub(r"([^\"\[{, ]\w+)\s*:", r' "\1":', content, flags=re.M)
-    # replace single quotes with double quotes
-    content = re.sub(r"'([^'\"]*)\s*'", r'"\1"', content, flags=re.M)
-    # remove final extra comma of arrays definition
-    content = re.sub(r",\s*([\}\)\]])", r"\1", content, flags=re.M)
-    # change hex numbers to int but not CSS hexa colors
-    content = re.sub(
-        "(#[0-9abcdedABCDEF]*)?0'?([xbhdXBHD])([0-9abcdefABCDEF]+)",
-        _number_convert,
-        content,
-        flags=re.M,
-    )
-    return content
+
+    DECODER = json.JSONDecoder()
+    SKIP = re.compile(r"(?:\s+|//[^\n]*)*")
+    WORD = re.compile(r"(?:[^\s{}\[\]:,\"'/]|/(?!/))(?:[^\s{}\[\]:,\"/]|/(?!/))*")
+    SINGLE_QUOTED = re.compile(r"'((?:[^'\\\n]|\\.)*)'")
+    ESCAPE = re.compile(r'\\.|"')
+    NUMBER = re.compile(r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?")
+    BASED_NUMBER = re.compile(r"(?:0|\d+')([bdhxBDHX])([0-9a-fA-F]+)")
+    BASES = {"b": 2, "d": 10, "h": 16, "x": 16}
+    LITERALS = {
+        "true": True,
+        "false": False,
+        "null": None,
+        "NaN": float("nan"),
+        "Infinity": float("inf"),
+        "-Infinity": float("-inf"),
+    }
+
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self.pos = 0
+
+    def error(self, msg: str, pos: int = None) -> None:
+        """stop with the line and column of the error"""
+        pos = self.pos if pos is None else pos
+        line = self.content.count("\n", 0, pos) + 1
+        column = pos - self.content.rfind("\n", 0, pos)
+        log.fatal(log.SYNTAX_ERROR_AT % (msg, line, column))
+
+    def peek(self) -> str:
+        """skip spaces and comments and return the next character"""
+        self.pos = _Parser.SKIP.match(self.content, self.pos).end()
+        return self.content[self.pos : self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            self.error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def parse(self) -> dict:
+        """parse the whole content which shall be an object"""
+        if not self.peek():
+            log.fatal(log.FILE_EMPTY)
+        if self.peek() != "{":
+            self.error("Expecting an object")
+        ans = self.value()
+        if self.peek():
+            self.error("Extra data")
+        return ans
+
+    def value(self):
+        char = self.peek()
+        if char in "{[" and char:
+            try:
+                ans, self.pos = _Parser.DECODER.raw_decode(self.content, self.pos)
+                return ans
+            except json.JSONDecodeError:
+                pass
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char in "\"'" and char:
+            return self.string()
+        pos, word = self.pos, self.word()
+        if word in _Parser.LITERALS:
+            return _Parser.LITERALS[word]
+        if _Parser.NUMBER.fullmatch(word):
+            return float(word) if any(c in word for c in ".eE") else int(word)
+        match = _Parser.BASED_NUMBER.fullmatch(word)
+        if match:
+            base, number = match.groups()
+            return int(number, _Parser.BASES[base.lower()])
+        self.error(f"Unexpected '{word}'", pos)
+
+    def word(self) -> str:
+        match = _Parser.WORD.match(self.content, self.pos)
+        if not match:
+            self.error("Expecting value")
+        self.pos = match.end()
+        return match.group(0)
+
+    def string(self) -> str:
+        begin = start = self.pos
+        content = self.content
+        if content[start] == "'":
+            match = _Parser.SINGLE_QUOTED.match(content, start)
+            if not match:
+                self.error("Unterminated string", begin)
+            self.pos = match.end()
+            # same escape sequences as double quoted strings: only \' and
+            # bare double quotes differ, other escapes are kept as they are
+            content = _Parser.ESCAPE.sub(
+                lambda m: {"\\'": "'", '"': '\\"'}.get(m.group(0), m.group(0)),
+                match.group(1),
+            )
+            content, start = '"%s"' % content, 0
+        try:
+            ans, end = json.decoder.scanstring(content, start + 1)
+        except json.JSONDecodeError as e:
+            msg = re.sub(r"\s+at$", "", e.msg)
+            self.error(msg, e.pos if content is self.content else begin)
+        if content is self.content:
+            self.pos = end
+        return ans
+
+    def object(self) -> dict:
+        ans = {}
+        self.pos += 1
+        while self.peek() != "}":
+            char = self.peek()
+            if char in "\"'" and char:
+                key = self.string()
+            elif char and char not in "{}[]:,":
+                key = self.word()
+            else:
+                self.error("Expecting property name")
+            self.expect(":")
+            ans[key] = self.value()
+            if self.peek() != "}":
+                self.expect(",")
+        self.pos += 1
+        return ans
+
+    def array(self) -> list:
+        ans = []
+        self.pos += 1
+        while self.peek() != "]":
+            if not self.peek():
+                self.error("Expecting ']'")
+            ans.append(self.value())
+            if self.peek() != "]":
+                self.expect(",")
+        self.pos += 1
+        return ans
 
 
 def parse(filepath: str) -> Tuple[bool, Dict]:
     """
-    Parse a json file after pre-processing the file
-    to allow extra comments if needed
+    Parse a json file written in the relaxed json dialect of WaveDrom
+    (comments, keys without quotes, single quotes, extra commas, ...)
+    """
+    with open(filepath, "r+") as fp:
+        return loads(fp.read())
+
+
+def loads(content: str) -> Tuple[bool, Dict]:
+    """
+    Parse a json document written in the relaxed json dialect of WaveDrom
     """
     ans = {}
-    content = _prune_json(filepath)
-    # parse the pre-processed content
-    try:
-        tmp = json.loads(content)
-    except json.decoder.JSONDecodeError as e:
-        log.fatal(log.SYNTAX_ERROR % (e.msg, e.lineno))
+    # counter to have distinct spacer id
+    spacers = itertools.count(1)
+    tmp = _Parser(content).parse()
     # post-process to normalize the db
     for k, v in tmp.items():
         if k == "signal":
             for _, signal in enumerate(v):
                 signal_name, wave = (
-                    _parse_wavelane(signal)
+                    _parse_wavelane(signal, spacers)
                     if isinstance(signal, dict)
-                    else _parse_group(signal)
+                    else _parse_group(signal, spacers)
                 )
                 if signal_name in ans.keys():
                     log.warning(log.SIGNAL_DUPLICATED % signal_name)
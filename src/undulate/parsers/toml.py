@@ -7,12 +7,19 @@ def parse(filepath: str) -> Tuple[bool, Dict]:
     """
     Parse a toml file
     """
+    with open(filepath, "r+") as fp:
+        return loads(fp.read())
+
+
+def loads(content: str) -> Tuple[bool, Dict]:
+    """
+    Parse a toml document
+    """
     ans = {}
     try:
         import toml
 
-        with open(filepath, "r+") as fp:
-            ans = toml.load(fp)
+        ans = toml.loads(content)
     except ImportError:
         log.fatal(log.TOML_IMPORT)
     except toml.TomlDecodeError as e:
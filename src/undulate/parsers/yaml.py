@@ -1,18 +1,30 @@
 import undulate.logger as log
 
-from typing import Dict, Tuple
+from typing import Dict, TextIO, Tuple, Union
 
 
 def parse(filepath: str) -> Tuple[bool, Dict]:
     """
     Parse a yaml file
     """
+    with open(filepath, "r+") as fp:
+        return loads(fp)
+
+
+def loads(content: Union[str, TextIO]) -> Tuple[bool, Dict]:
+    """
+    Parse a yaml document given as a string or a stream
+
+    Only standard yaml tags are accepted (safe loader). The loader
+    based on libyaml is used when available as faster.
+    """
     ans = {}
     try:
         import yaml
 
-        with open(filepath, "r+") as fp:
-            ans = yaml.load(fp, Loader=yaml.Loader)
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        log.debug(f"Parse with yaml.{loader.__name__}")
+        ans = yaml.load(content, Loader=loader)
     except ImportError:
         log.fatal(log.YAML_IMPORT)
     except yaml.YAMLError as e:
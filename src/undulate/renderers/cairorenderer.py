@@ -78,7 +78,7 @@ class CairoRenderer(Renderer):
         self.ctx.save()
         if callable(extra):
             extra()
-        apply_stroke(self.ctx, style, Engine.CAIRO, overload)
+        apply_stroke(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
         self.ctx.new_path()
         for i, v in enumerate(vertices):
             if i == 0:
@@ -107,7 +107,7 @@ class CairoRenderer(Renderer):
             self.ctx.reset_clip()
         if callable(extra):
             extra()
-        apply_fill(self.ctx, style, Engine.CAIRO, overload)
+        apply_fill(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
         self.ctx.translate(arrow_description.x, arrow_description.y)
         self.ctx.rotate((arrow_description.angle - 90) * 3.14159 / 180)
         self.ctx.new_path()
@@ -135,7 +135,7 @@ class CairoRenderer(Renderer):
         self.ctx.save()
         if callable(extra):
             extra()
-        apply_fill(self.ctx, style, Engine.CAIRO, overload)
+        apply_fill(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
         self.ctx.new_path()
         for i, v in enumerate(vertices):
             if i == 0:
@@ -143,7 +143,7 @@ class CairoRenderer(Renderer):
             else:
                 self.ctx.line_to(v.x, v.y)
         self.ctx.fill_preserve()
-        apply_stroke(self.ctx, style, Engine.CAIRO, overload)
+        apply_stroke(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
         self.ctx.stroke()
         self.ctx.restore()
         return ""
@@ -198,10 +198,10 @@ class CairoRenderer(Renderer):
             # store last cmd
             previous_cmd = cmd
         if style in ["hide", "edge-arrow"]:
-            apply_fill(self.ctx, style, Engine.CAIRO, overload)
+            apply_fill(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
             self.ctx.fill()
         else:
-            apply_stroke(self.ctx, style, Engine.CAIRO, overload)
+            apply_stroke(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
             self.ctx.stroke()
         self.ctx.restore()
         return ""
@@ -223,9 +223,11 @@ class CairoRenderer(Renderer):
         self.ctx.save()
         if callable(extra):
             extra()
-        apply_fill(self.ctx, style, Engine.CAIRO, overload)
-        apply_font(self.ctx, style, Engine.CAIRO, overload)
-        ox, oy = text_align(self.ctx, style, str(text), Engine.CAIRO)
+        apply_fill(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
+        apply_font(self.ctx, style, Engine.CAIRO, overload, self.context.stylesheet)
+        ox, oy = text_align(
+            self.ctx, style, str(text), Engine.CAIRO, self.context.stylesheet
+        )
         self.ctx.move_to(x - ox, y - oy)
         self.ctx.show_text(str(text))
         self.ctx.restore()
@@ -244,30 +246,38 @@ class CairoRenderer(Renderer):
         Args:
             wavelanes (dict): parsed dictionary from the input file
             filename (str)  : file name of the output generated file
+            output (io.BufferedIOBase, optional): stream written instead of filename
             brick_width (int): by default 40
             brick_height (int): by default 20
             is_reg (bool):
                 if True `wavelanes` given represents a register
                 otherwise it represents a bunch of signals
+            context (RenderContext, optional): state of the drawing, new one by default
+            stylesheet (dict, optional): css rules, by default the global style
         """
         _id = kwargs.get("id", "a")
         filename = kwargs.get("filename", False)
+        # cairo surfaces accept file objects as well as file names
+        output = kwargs.get("output")
+        if output is None:
+            output = filename
         brick_width = kwargs.get("brick_width", 40)
         brick_height = kwargs.get("brick_height", 20)
         is_reg = kwargs.get("is_reg", False)
+        context = self.new_context(**kwargs)
         lkeys, width, height, n = self.size(wavelanes, **kwargs)
         # remove offset for the name in register
         if is_reg:
             height += (n + 1) * 12
         # consider padding of root
-        root_style = get_style("root")
+        root_style = get_style("root", stylesheet=context.stylesheet)
         val_top, unit_top = root_style.get("padding-top", (0.0, SizeUnit.PX))
         val_bot, unit_bot = root_style.get("padding-bottom", (0.0, SizeUnit.PX))
         height += (val_top * unit_top.value) + (val_bot * unit_bot.value)
         # select appropriate surface
         w, h = (width + lkeys + 11), height
         if self.extension == "svg":
-            self.surface = cairo.SVGSurface(filename, w, h)
+            self.surface = cairo.SVGSurface(output, w, h)
         elif self.extension == "png":
             self.surface = cairo.ImageSurface(
                 cairo.FORMAT_ARGB32, int(w * self.dpi / 72), int(h * self.dpi / 72)
@@ -276,13 +286,13 @@ class CairoRenderer(Renderer):
             sx, sy = sx * self.dpi / 72, sy * self.dpi / 72
             self.surface.set_device_scale(sx, sy)
         elif self.extension == "ps":
-            self.surface = cairo.PSSurface(filename, w, h)
+            self.surface = cairo.PSSurface(output, w, h)
             self.surface.set_eps(False)
         elif self.extension == "eps":
-            self.surface = cairo.PSSurface(filename, w, h)
+            self.surface = cairo.PSSurface(output, w, h)
             self.surface.set_eps(True)
         elif self.extension == "pdf":
-            self.surface = cairo.PDFSurface(filename, w, h)
+            self.surface = cairo.PDFSurface(output, w, h)
         else:
             log.critical(log.CAIRO_FORMAT % self.extension)
         # offset painting for padding emulation
@@ -304,9 +314,9 @@ class CairoRenderer(Renderer):
             offsetx=lkeys + 11,
         )
         self.ctx.show_page()
-        # write to an external file for png images
+        # write to the output for png images
         if self.extension == "png":
-            self.surface.write_to_png(filename)
+            self.surface.write_to_png(output)
         # otherwise close the file pointer
         else:
             self.surface.finish()
@@ -5,10 +5,13 @@ into different format
 
 import re
 import copy
+import bisect
+import itertools
 import undulate.skin
 import undulate.logger as log
 from undulate.skin import style_in_kwargs, get_style, SizeUnit, text_bbox
 from math import floor
+from dataclasses import dataclass, field
 from undulate.bricks.generic import (
     Brick,
     BrickFactory,
@@ -17,44 +20,151 @@ from undulate.bricks.generic import (
     Point,
     ShapeFactory,
     safe_eval,
+    report_expressions,
     ArrowDescription,
     SplineSegment,
 )
-from typing import List
-
-# Counter for unique id generation
-#: counter of group of wave unique id
-_WAVEGROUP_COUNT = 0
-#: counter of wave unique id
-_WAVE_COUNT = 0
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 EXCLUDED_NAMED_GROUPS = ["head", "foot", "config", "edges", "annotations"]
 
 
+@dataclass
+class LaneLayout:
+    """
+    Place taken by an entry of a group of waveforms
+
+    Attributes:
+        name (str): name of the wavelane, the spacer, or the group
+        kind (str): one of 'wave', 'spacer', or 'group'
+        dy (float): height taken by the entry (0 if overlayed)
+        length (float): estimated width of the waveform
+        title_width (float): width of the name of the waveform(s)
+        group (GroupLayout): layout of the entry if it is a group
+        y (float): position of the entry from the top of its group
+        nodes (Dict[str, Point]): position of the nodes of a spacer
+            from the top of its group
+    """
+
+    name: str
+    kind: str
+    dy: float = 0.0
+    length: float = 0.0
+    title_width: float = 0.0
+    group: Optional["GroupLayout"] = None
+    y: float = 0.0
+    nodes: Dict[str, Point] = field(default_factory=dict)
+
+
+@dataclass
+class GroupLayout:
+    """
+    Layout of a group of waveforms computed once before drawing
+    and shared by the size estimation and the drawing
+
+    Attributes:
+        wavelanes (dict): the group of waveforms described
+        depth (int): depth of the group in the hierarchy
+        brick_width (float): width of a brick in this group
+        brick_height (float): height of a brick in this group
+        separation (float): vertical space between two wavelanes
+        lanes (List[LaneLayout]): layout of each entry in drawing order
+        title_width (float): width of the longest name of waveforms
+        width (float): estimated width of the longest waveform
+        height (float): height of the group including its title
+        attributes (int): number of lines of register attributes
+        wave_width (float): width of the longest wave of the group itself
+        groups (int): number of groups nested at any depth
+        y_steps (List[Tuple[float, bool]]): height of each wavelane and title
+            of the group and its nested groups in drawing order, and if the
+            step is a title
+    """
+
+    wavelanes: dict
+    depth: int
+    brick_width: float
+    brick_height: float
+    separation: float
+    lanes: List[LaneLayout] = field(default_factory=list)
+    title_width: float = 0.0
+    width: float = 0.0
+    height: float = 0.0
+    attributes: int = 0
+    wave_width: float = 0.0
+    groups: int = 0
+    y_steps: List[Tuple[float, bool]] = field(default_factory=list)
+
+
+class RenderContext:
+    """
+    State of a single drawing shared by the methods of a renderer.
+    A new context is created for each call of draw() so that successive
+    drawings never share anything.
+
+    Attributes:
+        nodes (NodeBank): position of the nodes for annotations
+        y_steps (List[float]): height of each wavelane and title
+        y_offsets (List[float]): y-coordinate of each step (prefix sum of y_steps)
+        y_lanes (List[int]): number of wavelanes up to each step, titles excluded
+        y_titles (List[int]): index in y_steps of the titles of groups
+        wave_count (int): counter of wave unique id
+        wavegroup_count (int): counter of group of wave unique id
+        stylesheet (Dict[str, dict]): css rules used for the drawing
+        layout (GroupLayout): layout of the drawing once computed by size()
+        failed_expressions (Set[str]): strings already reported as not being
+            expressions in this drawing
+    """
+
+    __slots__ = [
+        "nodes",
+        "y_steps",
+        "y_offsets",
+        "y_lanes",
+        "y_titles",
+        "wave_count",
+        "wavegroup_count",
+        "stylesheet",
+        "layout",
+        "failed_expressions",
+    ]
+
+    def __init__(self, stylesheet: dict = None) -> None:
+        self.nodes = NodeBank()
+        self.y_steps = []
+        self.y_offsets = [0.0]
+        self.y_lanes = []
+        self.y_titles = []
+        self.wave_count = 0
+        self.wavegroup_count = 0
+        self.stylesheet = undulate.skin.default_style() if stylesheet is None else stylesheet
+        self.layout = None
+        self.failed_expressions = set()
+
+
 def incr_wavelane(f):
     """
-    incr_wavelane is a decorator that increment _WAVE_COUNT in auto.
+    incr_wavelane is a decorator that increment the wave counter
+    of the render context in auto.
     This generates a unique id for each wavelane
     """
 
-    def wrapper(*args, **kwargs):
-        global _WAVE_COUNT
-        _WAVE_COUNT += 1
-        return f(*args, **kwargs)
+    def wrapper(self, *args, **kwargs):
+        self.context.wave_count += 1
+        return f(self, *args, **kwargs)
 
     return wrapper
 
 
 def incr_wavegroup(f):
     """
-    incr_wavegroup is a decorator that increment _WAVEGROUP_COUNT in auto.
+    incr_wavegroup is a decorator that increment the wavegroup counter
+    of the render context in auto.
     This generates a unique id for each group of wavelanes
     """
 
-    def wrapper(*args, **kwargs):
-        global _WAVEGROUP_COUNT
-        _WAVEGROUP_COUNT += 1
-        return f(*args, **kwargs)
+    def wrapper(self, *args, **kwargs):
+        self.context.wavegroup_count += 1
+        return f(self, *args, **kwargs)
 
     return wrapper
 
@@ -107,11 +217,25 @@ class Renderer:
         r"(?P<text>[\w \t.]*)$"
     )
     _SYMBOL_TEMP = None
-    y_steps = []
 
     def __init__(self):
         self.ctx = None
         self.engine = None
+        self.context = RenderContext()
+
+    def new_context(self, **kwargs) -> RenderContext:
+        """
+        Start a new drawing with a fresh render context
+
+        Parameters:
+            context (RenderContext, optional): context to use instead of a new one
+            stylesheet (dict, optional): css rules of the drawing
+        """
+        context = kwargs.get("context")
+        if context is None:
+            context = RenderContext(kwargs.get("stylesheet"))
+        self.context = context
+        return context
 
     @staticmethod
     def is_spacer(name: str) -> bool:
@@ -121,6 +245,18 @@ class Renderer:
             return True
         return False
 
+    def emit(self, fragment: str) -> str:
+        """
+        Hand over a drawn fragment as soon as it is produced
+
+        By default, the fragment is given back to be concatenated by the caller.
+        A renderer writing into a stream can write it and return an empty string.
+
+        Args:
+            fragment (str): drawing instructions in the order of the document
+        """
+        return fragment
+
     def group(self, callback, identifier: str, **kwargs) -> str:
         """
         Group some drawable together
@@ -200,36 +336,36 @@ class Renderer:
         """
         Draw the symbol of a given Brick element
         """
-        ans, content = "", ""
+        ans, content = "", []
         # display polygons (usually background)
         for _, poly in enumerate(b.polygons):
-            content += self.polygon(poly.object, style_repr=poly.style, **kwargs)
+            content.append(self.polygon(poly.object, style_repr=poly.style, **kwargs))
         # display path (for borders and edges)
         for _, path in enumerate(b.paths):
-            content += self.path(path.object, style_repr=path.style, **kwargs)
+            content.append(self.path(path.object, style_repr=path.style, **kwargs))
         # display arrows
         for _, arrow in enumerate(b.arrows):
-            content += self.arrow(
-                arrow.object,
-                style_repr=arrow.style,
-                **kwargs,
+            content.append(
+                self.arrow(
+                    arrow.object,
+                    style_repr=arrow.style,
+                    **kwargs,
+                )
             )
         # display borders or edges
         for _, spline in enumerate(b.splines):
-            content += self.spline(spline.object, style_repr=spline.style, **kwargs)
+            content.append(self.spline(spline.object, style_repr=spline.style, **kwargs))
         # format text and display them
         for _, span in enumerate(b.texts):
             # get style of text
-            a = copy.deepcopy(kwargs)
-            a.update({"style_repr": span.style})
-            content += self.text(*span.object, **a)
+            args = {**kwargs, "style_repr": span.style}
+            content.append(self.text(*span.object, **args))
         # special function to apply at the end depending on the renderer
         if callable(self._SYMBOL_TEMP):
-            ans = self._SYMBOL_TEMP(symbol, content, **kwargs)
+            ans = self._SYMBOL_TEMP(symbol, "".join(content), **kwargs)
         return ans
 
-    @staticmethod
-    def adjust_y(index, brick_height: float = 1.0) -> float:
+    def adjust_y(self, index, brick_height: float = 1.0) -> float:
         """
         Convert an integer expression the index of the waveform
         as a y-coordinate in the drawing context
@@ -240,21 +376,17 @@ class Renderer:
         Returns:
             equivalent y-coordinate
         """
-        total_y, k, s = 0, 0, 0
-        for dy in Renderer.y_steps:
-            # 't' means title with potential separation
-            if dy == "t":
-                k -= 1
-                s += 1
-            elif k + 1 > floor(index):
-                break
-            else:
-                k += 1
-                total_y += dy
-        return total_y + (index - k) * brick_height
+        ctx = self.context
+        # first step going beyond the index of the waveform
+        i = bisect.bisect_right(ctx.y_lanes, floor(index))
+        if i < len(ctx.y_lanes):
+            k = ctx.y_lanes[i] - 1
+        else:
+            k = ctx.y_lanes[-1] if ctx.y_lanes else 0
+        return ctx.y_offsets[i] + (index - k) * brick_height
 
-    @staticmethod
     def from_to_parser(
+        self,
         s: object,
         width: float,
         height: float,
@@ -293,12 +425,12 @@ class Renderer:
         if isinstance(s, str):
             s = s.strip()
             # if s corresponds to a node
-            if s in NodeBank.nodes:
-                return NodeBank.nodes.get(s)
+            if s in self.context.nodes.nodes:
+                return self.context.nodes.nodes.get(s)
             # if s corresponds to node_name + (dx, dy)
             match = re.match(re_str_node_tuple, s)
             if match:
-                p = NodeBank.nodes.get(match.group("node"))
+                p = self.context.nodes.nodes.get(match.group("node"))
                 if p:
                     ans.x = p.x + float(match.group("dx")) * brick_width
                     ans.y = p.y + float(match.group("dy")) * brick_height
@@ -315,30 +447,64 @@ class Renderer:
                 if "%" in s[1]:
                     ans.y = float(s[1].replace("%", "")) * height / 100
                 else:
-                    ans.y = Renderer.adjust_y(float(s[1]), brick_height)
+                    ans.y = self.adjust_y(float(s[1]), brick_height)
                 return ans
             if "%" in s:
                 ans.x = float(s.replace("%", "")) * width / 100
                 ans.y = float(s.replace("%", "")) * height / 100
                 return ans
-            s = safe_eval(s)
+            s = safe_eval(s, reported=self.context.failed_expressions)
         # if s is a tuple
         if isinstance(s, tuple):
             ans.x = float(s[0]) * brick_width
-            ans.y = Renderer.adjust_y(float(s[1]), brick_height)
+            ans.y = self.adjust_y(float(s[1]), brick_height)
             return ans
         # if s is only a number
         if isinstance(s, (int, float)):
             ans.x = s * brick_width
-            ans.y = Renderer.adjust_y(s, brick_height)
+            ans.y = self.adjust_y(s, brick_height)
             return ans
         log.fatal(log.FROM_TO_UNKNOWN_FORMAT % str(s), 8)
 
-    @staticmethod
-    def register_y_step(dy, is_title: bool = False):
+    def register_y_step(self, dy, is_title: bool = False):
+        """
+        Register the height of a wavelane or of the title of a group
+        to convert later the index of a waveform into a y-coordinate
+
+        Args:
+            dy (float): height of the wavelane
+            is_title (bool): the step is the title of a group
+        """
+        ctx = self.context
+        lanes = ctx.y_lanes[-1] if ctx.y_lanes else 0
         if is_title:
-            Renderer.y_steps.append("t")
-        Renderer.y_steps.append(dy)
+            ctx.y_titles.append(len(ctx.y_steps))
+        else:
+            lanes += 1
+        ctx.y_steps.append(dy)
+        ctx.y_offsets.append(ctx.y_offsets[-1] + dy)
+        ctx.y_lanes.append(lanes)
+
+    @staticmethod
+    def spacer_nodes(node: str, y: float, brick_width: float) -> Dict[str, Point]:
+        """
+        Position of the nodes of a lane without waveform, such as a spacer
+        declaring only "node", to be used by the edges of the drawing
+
+        Args:
+            node (str): node description of the lane, with '#' for expanded names
+            y (float): y-coordinate of the middle of the lane
+            brick_width (float): width of a brick
+        Returns:
+            the position of each node
+        """
+        ans = {}
+        nodes, *expended_names = node.split(" ")
+        for i, name in enumerate(nodes):
+            if name == "#":
+                name = expended_names.pop(0)
+            ans[name] = Point(i * brick_width, y)
+        return ans
 
     def annotate(self, wavelanes: dict, viewport: tuple, **kwargs) -> str:
         """
@@ -383,20 +549,22 @@ class Renderer:
             x = a.get("x", 0)
             y = a.get("y", 0)
             dx = a.get("dx", 0) * brick_width
-            dy = Renderer.adjust_y(a.get("dy", 0), brick_height)
+            dy = self.adjust_y(a.get("dy", 0), brick_height)
             start = a.get("from", None)
             end = a.get("to", None)
             text = a.get("text", "")
             text_background = a.get("text_background", True)
             ans = ""
-            s = Renderer.from_to_parser(start, width, height, brick_width, brick_height)
-            e = Renderer.from_to_parser(end, width, height, brick_width, brick_height)
+            s = self.from_to_parser(start, width, height, brick_width, brick_height)
+            e = self.from_to_parser(end, width, height, brick_width, brick_height)
             log.debug(a)
             log.debug(f"Edge from {start}:{s} to {end}:{e}")
             # compatibility support of issue #17
             if s.x == 0 and s.y == 0 and e.x != 0 and e.y != 0:
                 s = Point(e.x - brick_width / 2, e.y)
-                txt_font_size = get_style("edge-text").get("font-size") or (
+                txt_font_size = get_style(
+                    "edge-text", stylesheet=self.context.stylesheet
+                ).get("font-size") or (
                     1.0,
                     SizeUnit.EM,
                 )
@@ -410,7 +578,7 @@ class Renderer:
             overload = style_in_kwargs(**a)
             # hline
             if shape == "-":
-                y = Renderer.adjust_y(y, brick_height)
+                y = self.adjust_y(y, brick_height)
                 if isinstance(end, (float, int)):
                     xmax = xmin + end * brick_width
                 else:
@@ -426,9 +594,9 @@ class Renderer:
                 ymin = 0
                 ymax = height
                 if isinstance(start, (float, int)):
-                    ymin = Renderer.adjust_y(start, brick_height)
+                    ymin = self.adjust_y(start, brick_height)
                 if isinstance(end, (float, int)):
-                    ymax = Renderer.adjust_y(end, brick_height)
+                    ymax = self.adjust_y(end, brick_height)
                 overload["x"] = x
                 overload["ymin"] = ymin
                 overload["ymax"] = ymax
@@ -455,13 +623,18 @@ class Renderer:
                         {
                             "style_repr": "edge-text",
                             "x": xmin + x * brick_width,
-                            "y": Renderer.adjust_y(y, brick_height),
+                            "y": self.adjust_y(y, brick_height),
                             "text": text,
                         }
                     )
                 if text_background:
                     ox, oy, w, h = undulate.skin.text_bbox(
-                        self.ctx, "edge-text", text, self.engine, overload
+                        self.ctx,
+                        "edge-text",
+                        text,
+                        self.engine,
+                        overload,
+                        self.context.stylesheet,
                     )
                     x = overload.get("x")
                     y = overload.get("y")
@@ -479,7 +652,12 @@ class Renderer:
                 ans += self.text(**overload)
             return ans
 
-        return "\n".join([__annotate__(a, viewport) for a in annotations])
+        ans = []
+        for i, a in enumerate(annotations):
+            if i > 0:
+                ans.append(self.emit("\n"))
+            ans.append(self.emit(__annotate__(a, viewport)))
+        return "".join(ans)
 
     def wavelane_title(self, name: str, **kwargs) -> str:
         """
@@ -524,58 +702,86 @@ class Renderer:
             List[Brick]
         """
         repeat = kwargs.get("repeat", 1)
-        # calculate total length of the wavelance
-        TOTAL_LENGTH = len(wavelane) * int(repeat)
-        # calculate parameters for each brick of a given wavelane
-        needed_params = BrickFactory.get_parameters()
-        for param in list(needed_params.keys()):
+        # import the modules implementing the symbols of the wavelane
+        for symbol in set(wavelane):
+            BrickFactory.resolve(symbol)
+        # evaluate parameters given as string
+        reported = self.context.failed_expressions
+        for param in BrickFactory.get_parameters():
             if isinstance(kwargs.get(param), str):
-                kwargs[param] = safe_eval(kwargs[param])
-            params = param + "s" if param not in ["data", "analogue"] else param
+                kwargs[param] = safe_eval(kwargs[param], reported=reported)
             # for specific data attribute allow split of space separated string
             if isinstance(kwargs.get(param), str) and param == "data":
                 kwargs[param] = kwargs.get(param).split(" ")
-            # multiply singular value to create 1 value per brick
+            params = Renderer._plural(param)
+            if isinstance(kwargs.get(params), str):
+                kwargs[params] = safe_eval(kwargs[params], reported=reported)
+        # resolve only the parameters needed by the symbols of the wavelane
+        needed_params = {
+            param: Renderer._param_resolver(param, kwargs)
+            for symbol in set(wavelane)
+            for param in BrickFactory.params.get(symbol, {})
+        }
+        # values per brick are given by the resolvers and not by kwargs
+        for param in BrickFactory.get_parameters():
             if isinstance(kwargs.get(param), list):
-                needed_params[params] = kwargs.get(param) * TOTAL_LENGTH
-            else:
-                needed_params[params] = [kwargs.get(param)] * TOTAL_LENGTH
-            # select if available multiple values variant over repeat singular one
-            if params in kwargs:
-                if isinstance(kwargs[params], str):
-                    kwargs[params] = safe_eval(kwargs[params])
-                needed_params[params] = kwargs.get(params) or needed_params[params]
+                kwargs.pop(param)
+            kwargs.pop(Renderer._plural(param), None)
         # computed properties
         follow_data = False
         previous_symbol = " "
         _wavelane = []
-        # ensure nodes and wavelane have the same size
-        if len(nodes) < len(wavelane) * repeat:
-            nodes.extend([None] * (len(wavelane) * repeat - len(nodes)))
         # initialize the waveform
         for i, b in enumerate(wavelane * repeat):
-            brick_args = copy.deepcopy(kwargs)
-            for param in BrickFactory.params.get(b, []):
-                params = param + "s" if param not in ["data", "analogue"] else param
-                default = BrickFactory.params.get(b, {}).get(param)
-                if needed_params[params]:
-                    brick_args[param] = needed_params[params].pop(0)
-                else:
-                    brick_args[param] = default
-                if brick_args[param] is None:
-                    brick_args[param] = default
+            # arguments of the wavelane are shared by all its bricks
+            brick_args = {}
+            for param, default in BrickFactory.params.get(b, {}).items():
+                value = needed_params[param]()
+                brick_args[param] = default if value is None else value
             brick_args["follow_data"] = follow_data
             brick_args["is_first"] = i == 0
             brick_args["repeat"] = 1
             brick_args["name"] = name
-            brick_args["node_name"] = nodes.pop(0)
-            # generate the brick
-            _wavelane.append(BrickFactory.create(b, **brick_args))
-            log.debug(f"{name} {b} {_wavelane[-1]!r} {_wavelane[-1].get_last_y()}")
+            brick_args["node_name"] = nodes[i] if i < len(nodes) else None
+            # describe the brick, the geometry is built after filtering
+            _wavelane.append(BrickFactory.describe(b, kwargs, **brick_args))
+            log.debug(f"{name} {b} {_wavelane[-1]!r}")
             follow_data = "data" in BrickFactory.tags[previous_symbol]
             previous_symbol = b
-        # apply all registered filters
-        return FilterBank.apply(_wavelane)
+        # apply all registered filters and build each brick once, the bricks
+        # evaluating expressions report them through the render context
+        with report_expressions(reported):
+            return [brick.build() for brick in FilterBank.apply(_wavelane)]
+
+    @staticmethod
+    def _plural(param: str) -> str:
+        """name of the parameter giving one value per brick"""
+        return param + "s" if param not in ["data", "analogue"] else param
+
+    @staticmethod
+    def _param_resolver(param: str, kwargs: dict) -> Callable[[], Any]:
+        """
+        Give the value of a parameter for each successive brick using it
+
+        A list of values per brick (e.g. periods) is consumed once, while a
+        list given for the singular parameter is repeated, and a single
+        value is shared by all bricks.
+
+        Args:
+            param (str): name of the parameter
+            kwargs (dict): parameters of the wavelane
+        Returns:
+            function returning the value of the next brick, None when exhausted
+        """
+        values = kwargs.get(Renderer._plural(param))
+        if values and isinstance(values, (list, tuple)):
+            it = iter(values)
+            return lambda: next(it, None)
+        value = kwargs.get(param)
+        if isinstance(value, list):
+            it = itertools.cycle(value)
+            return lambda: next(it, None)
+        return lambda: value
 
     def _get_or_eval(self, name: str, default: str = "", **kwargs):
         """
@@ -583,7 +789,7 @@ class Renderer:
         """
         param = kwargs.get(name) or default
         if isinstance(param, str):
-            return safe_eval(param)
+            return safe_eval(param, reported=self.context.failed_expressions)
         return param
 
     @incr_wavelane
@@ -625,10 +831,10 @@ class Renderer:
             brick.args.update({"extra": self.translate(x, 0, dont_touch=True), "pos_x": x})
             # add style informations
             brick.args.update(style_in_kwargs(**kwargs))
-            # generate the brick
-            wave.append(BrickFactory.create(brick.symbol, **brick.args))
+            # geometry does not depend on position nor style
+            wave.append(brick)
             # register node position
-            NodeBank.register(
+            self.context.nodes.register(
                 brick.node_name, Point(x + brick.slewing / 2, y + brick.height / 2)
             )
             # create the new brick
@@ -638,18 +844,21 @@ class Renderer:
         def _gen_wave():
             ans = []
             for brick in wave:
-                ans.append(self.brick(brick.symbol, brick, **brick.args))
+                ans.append(self.emit(self.brick(brick.symbol, brick, **brick.args)))
             return "".join(ans)
 
         def _gen():
-            ans = self.wavelane_title(name, **kwargs) if name else ""
+            ans = self.emit(self.wavelane_title(name, **kwargs) if name else "")
             ans += self.group(_gen_wave, name + "_wave", classes=["wave"])
             return ans
 
         # wrap the wavelane
         return self.group(
             _gen,
-            name if name else "wavelane_%d_%d" % (_WAVEGROUP_COUNT, _WAVE_COUNT),
+            name
+            if name
+            else "wavelane_%d_%d"
+            % (self.context.wavegroup_count, self.context.wave_count),
             extra=extra,
         )
 
@@ -672,20 +881,22 @@ class Renderer:
         phase = kwargs.get("phase", 0)
 
         def _gen():
-            ans = ""
+            ans = []
             for k in range(0, int(width / step)):
                 x = step * k
-                ans += self.path(
-                    [Point(x, 0), Point(x, height - offsety)],
-                    style_repr="tick",
-                    extra="",
-                    **kwargs,
+                ans.append(
+                    self.path(
+                        [Point(x, 0), Point(x, height - offsety)],
+                        style_repr="tick",
+                        extra="",
+                        **kwargs,
+                    )
                 )
-            return ans
+            return "".join(ans)
 
         return self.group(
             _gen,
-            "ticks_%d" % _WAVEGROUP_COUNT,
+            "ticks_%d" % kwargs.get("index", self.context.wavegroup_count),
             extra=self.translate(offsetx + phase * width, 0),
         )
 
@@ -704,7 +915,20 @@ class Renderer:
             brick_height (float): height of a brick, default is 20.0
             width (float): image width
             height (float): image height
+            layout (GroupLayout): layout of the group, by default the one
+                computed by size() or a new one
         """
+        # reuse the layout computed for the size of the image
+        is_root = "layout" not in kwargs
+        layout = kwargs.pop("layout", self.context.layout)
+        if layout is None or layout.wavelanes is not wavelanes:
+            layout = self.layout(wavelanes, depth, **kwargs)
+        if layout is None:
+            return (kwargs.get("offsety", 0), "")
+        # positions of the wavelanes are known before drawing any of them
+        if is_root:
+            for dy, is_title in layout.y_steps:
+                self.register_y_step(dy, is_title)
         # prepare the return group
         _default_offset_x = [
             len(s) + 1
@@ -713,13 +937,9 @@ class Renderer:
         ]
         # options for size of bricks
         config = wavelanes.get("config", {})
-        vscale = config.get("vscale", 1.0)
-        hscale = config.get("hscale", 1.0)
-        brick_width = kwargs.get("brick_width", 40) * hscale
-        brick_height = kwargs.get("brick_height", 20) * vscale
-        separation = config.get("separation", kwargs.get("separation", 0.25))
-        if depth == 1:
-            separation *= brick_height
+        brick_width = layout.brick_width
+        brick_height = layout.brick_height
+        separation = layout.separation
         # update kwargs
         kwargs.update(
             {
@@ -729,7 +949,9 @@ class Renderer:
             }
         )
         # options for reserved space for signal names
-        name_font_size = get_style("text").get("font-size") or (1.0, SizeUnit.EM)
+        name_font_size = get_style("text", stylesheet=self.context.stylesheet).get(
+            "font-size"
+        ) or (1.0, SizeUnit.EM)
         name_font_size = name_font_size[0] * name_font_size[1].value
         offsetx = kwargs.get("offsetx", max(_default_offset_x, default=0) * name_font_size)
         offsety = kwargs.get("offsety", 0)
@@ -741,9 +963,9 @@ class Renderer:
         no_ticks = config.get("no_ticks", depth > 1)
         # position of | symbol
         gap_offset = config.get("gap-offset", brick_width * 0.5)
-
-        if not isinstance(wavelanes, dict):
-            return (offsety, "")
+        # maximum error in px allowed to simplify analogue curves
+        if "analogue_tolerance" in config:
+            kwargs["analogue_tolerance"] = float(config["analogue_tolerance"])
 
         def _gen(
             offset: Point,
@@ -752,73 +974,84 @@ class Renderer:
             brick_width: float,
             brick_height: float,
         ) -> str:
-            ans = ""
+            ans = []
+            # add ticks only for the principale group
+            # (known before drawing to be below the waveforms)
+            if not no_ticks:
+                kw = {
+                    "offsetx": offset.x,
+                    "step": brick_width,
+                    "width": max(width, layout.wave_width),
+                    "height": height,
+                    "phase": config.get("ticks_phase", 0),
+                    "index": self.context.wavegroup_count + layout.groups,
+                }
+                ans.append(self.emit(self.ticks(**kw)))
+                ans.append(self.emit("\n"))
             # create a label and separator to identify groups of signals
             if depth > 1:
                 # get font size for position estimation
-                grp_font_size = get_style("h%d" % depth).get("font-size") or (
+                grp_font_size = get_style(
+                    "h%d" % depth, stylesheet=self.context.stylesheet
+                ).get("font-size") or (
                     1.0,
                     SizeUnit.EM,
                 )
                 grp_font_size = grp_font_size[0] * grp_font_size[1].value
                 # add group name
-                ans = self.text(
-                    0,
-                    offset.y + separation + brick_height * 0.9 - grp_font_size,
-                    name,
-                    style_repr="h%d" % depth,
-                    **kwargs,
+                ans.append(
+                    self.emit(
+                        self.text(
+                            0,
+                            top + separation + brick_height * 0.9 - grp_font_size,
+                            name,
+                            style_repr="h%d" % depth,
+                            **kwargs,
+                        )
+                    )
                 )
                 # add group separator
                 if depth == 2:
-                    ans += self.path(
-                        [
-                            Point(0, offset.y + brick_height),
-                            Point(offset.x + width, offset.y + brick_height),
-                        ],
-                        style_repr="border ctx-y",
-                        **kwargs,
+                    ans.append(
+                        self.emit(
+                            self.path(
+                                [
+                                    Point(0, top + brick_height),
+                                    Point(offset.x + width, top + brick_height),
+                                ],
+                                style_repr="border ctx-y",
+                                **kwargs,
+                            )
+                        )
                     )
-                # some space for group separation if not the root
-                offset.y += brick_height + separation
-                Renderer.register_y_step(brick_height + separation, is_title=True)
-            # look through waveforms data
-            for _, wavetitle in enumerate(wavelanes.keys()):
-                # annotations, config, edges, ... are list
-                # and not parsed on the fly
-                if not isinstance(wavelanes[wavetitle], dict):
-                    continue
-                if wavetitle in EXCLUDED_NAMED_GROUPS:
-                    continue
-                # signals and registers are in a dict
-                # height of a single waveform
-                dy = brick_height * wavelanes[wavetitle].get("vscale", 1) + separation
+            # look through the layout of waveforms
+            for lane in layout.lanes:
+                wavetitle = lane.name
+                offset.y = top + lane.y
                 # waveform generation
-                if "wave" in wavelanes[wavetitle]:
+                if lane.kind == "wave":
                     wave, args = wavelanes[wavetitle]["wave"], wavelanes[wavetitle]
                     # propagate information from hierarchy
                     args.update(**kwargs)
                     args.update({"gap-offset": gap_offset})
                     # generate the waveform of this signal
-                    ans += self.wavelane(
-                        wavetitle,
-                        wave,
-                        self.translate(offset.x, offset.y),
-                        offset.y,
-                        **args,
+                    ans.append(
+                        self.emit(
+                            self.wavelane(
+                                wavetitle,
+                                wave,
+                                self.translate(offset.x, offset.y),
+                                offset.y,
+                                **args,
+                            )
+                        )
                     )
-                    # if the waveform of this signal will be overlayed
-                    # do not increment the position
-                    overlay = args.get("overlay", False)
-                    if overlay:
-                        dy = 0
-                    width = max(len(wave) * brick_width, width)
-                    Renderer.register_y_step(dy)
                 # spacer or only for label nodes
-                elif Renderer.is_spacer(wavetitle) or "node" in wavelanes[wavetitle]:
-                    Renderer.register_y_step(dy)
+                elif lane.kind == "spacer":
+                    for node, point in lane.nodes.items():
+                        self.context.nodes.register(node, Point(point.x, top + point.y))
                 # named group
-                elif wavetitle not in EXCLUDED_NAMED_GROUPS:
+                else:
                     args = copy.deepcopy(kwargs)
                     args.update(
                         {
@@ -826,30 +1059,21 @@ class Renderer:
                             "offsety": offset.y,
                             "no_ticks": True,
                             "gap-offset": gap_offset,
+                            "layout": lane.group,
                         }
                     )
-                    dy, tmp = self.wavegroup(
+                    _, tmp = self.wavegroup(
                         wavetitle,
                         wavelanes[wavetitle],
                         depth + 1,
                         **args,
                     )
-                    ans += tmp
-                offset.y += dy
-            # add ticks only for the principale group
-            if not no_ticks:
-                kw = {
-                    "offsetx": offset.x,
-                    "step": brick_width,
-                    "width": width,
-                    "height": height,
-                    "phase": config.get("ticks_phase", 0),
-                }
-                ans = "%s\n%s" % (self.ticks(**kw), ans)
-            return ans
+                    ans.append(self.emit(tmp))
+            offset.y = top + layout.height
+            return "".join(ans)
 
         # room for displaying names
-        start_y, offset = offsety, Point(offsetx, offsety)
+        top, offset = offsety, Point(offsetx, offsety)
         ans = self.group(
             lambda: _gen(offset, width, height, brick_width, brick_height), name
         )
@@ -857,30 +1081,25 @@ class Renderer:
         ans += self.annotate(
             wavelanes, viewport=(offset.x, 0, width, height), depth=depth, **kwargs
         )
-        return (offset.y - start_y, ans)
+        return (offset.y - top, ans)
 
-    def size(self, wavelanes, depth: int = 1, **kwargs):
+    def layout(self, wavelanes, depth: int = 1, **kwargs) -> Optional[GroupLayout]:
         """
-        Pre-estimate the size of the image (duplicate of wavegroup without drawing)
+        Compute once the place taken by each wavelane, spacer, and group
+        before drawing them
 
         Args:
-            name (str) : name of the waveform group
             wavelanes (Dict[str, dict]): named waveforms composing the group
             depth (int) : depth of nested groups to represent hierarchy
         Parameters:
             config (Dict[str, Any]): config section of the input file
             brick_width (float): width of a brick, default is 20.0
             brick_height (float): height of a brick, default is 20.0
-            width (float): image width
-            height (float): image height
-
-        .. warning::
-
-            Might be good to implement a parameter no_drawing in wavegroup
-            and performs 2 passes to prevent possible discrepency
+        Returns:
+            the layout of the group or None if wavelanes is not a group
         """
         if not isinstance(wavelanes, dict):
-            return (0, 0, 0, 0)
+            return None
         # options for size of bricks
         config = wavelanes.get("config", {})
         vscale = config.get("vscale", 1.0)
@@ -898,55 +1117,102 @@ class Renderer:
                 "separation": separation,
             }
         )
-        # return kind of a viewport
-        x, y, n, keys = [0], (brick_height + separation) if depth > 1 else 0, 0, [0]
+        layout = GroupLayout(wavelanes, depth, brick_width, brick_height, separation)
+        # space for the name of the group
+        layout.height = (brick_height + separation) if depth > 1 else 0
+        if depth > 1:
+            layout.y_steps.append((layout.height, True))
         # look through all wavelanes
-        for wavetitle in wavelanes.keys():
-            if not isinstance(wavelanes[wavetitle], dict):
+        for wavetitle, wavelane in wavelanes.items():
+            if not isinstance(wavelane, dict):
                 continue
             # add some extra for attr in registers
-            _attr = wavelanes[wavetitle].get("attr", [(0, None)])
+            _attr = wavelane.get("attr", [(0, None)])
             if isinstance(_attr, list):
                 _n = [
                     len(a[-1]) if isinstance(a[-1], list) else 0 if a[-1] is None else 1
                     for a in _attr
                 ]
-                n = max(n, len(_n))
+                layout.attributes = max(layout.attributes, len(_n))
             else:
-                n = max(n, 1)
+                layout.attributes = max(layout.attributes, 1)
+            if wavetitle in EXCLUDED_NAMED_GROUPS:
+                continue
+            # height of a single waveform
+            dy = brick_height * wavelane.get("vscale", 1) + separation
             # handle a wavelane
-            dy = brick_height * wavelanes[wavetitle].get("vscale", 1) + separation
-            if "wave" in wavelanes[wavetitle]:
+            if "wave" in wavelane:
                 # estimate length of the wavelane
-                # TODO create a wavelane_size function
-                if "periods" not in wavelanes[wavetitle]:
-                    _l = len(wavelanes[wavetitle]["wave"])
+                if "periods" not in wavelane:
+                    _l = len(wavelane["wave"])
                 else:
-                    periods = self._get_or_eval("periods", [], **wavelanes[wavetitle])
+                    periods = self._get_or_eval("periods", [], **wavelane)
                     _l = sum(periods)
                 _l *= brick_width
-                _l *= wavelanes[wavetitle].get("repeat", 1)
-                _l *= wavelanes[wavetitle].get("period", 1)
-                x.append(_l)
-                # estimate height
-                if wavelanes[wavetitle].get("overlay", False):
+                _l *= wavelane.get("repeat", 1)
+                _l *= wavelane.get("period", 1)
+                # if the waveform of this signal will be overlayed
+                # do not increment the position
+                if wavelane.get("overlay", False):
                     dy = 0
-                _, _, tw, _ = text_bbox(None, "title", wavetitle, None)
-                keys.append(tw)
+                _, _, tw, _ = text_bbox(
+                    None, "title", wavetitle, None, stylesheet=self.context.stylesheet
+                )
+                lane = LaneLayout(wavetitle, "wave", dy, _l, tw)
+                layout.wave_width = max(
+                    layout.wave_width, len(wavelane["wave"]) * brick_width
+                )
             # if it is only spacers allocate space
-            elif Renderer.is_spacer(wavetitle) or "node" in wavelanes[wavetitle]:
-                pass
+            elif Renderer.is_spacer(wavetitle) or "node" in wavelane:
+                lane = LaneLayout(wavetitle, "spacer", dy)
+                lane.nodes = self.spacer_nodes(
+                    wavelane.get("node", ""),
+                    layout.height + (dy - separation) / 2,
+                    brick_width,
+                )
             # otherwise it is a new wavegroup
             # or an old wavegroup
-            elif wavetitle not in EXCLUDED_NAMED_GROUPS:
-                lkeys, _x, dy, _n = self.size(wavelanes[wavetitle], depth + 1, **kwargs)
-                x.append(_x)
-                n += _n
-                keys.append(lkeys)
             else:
-                dy = 0
-            y += dy
-        return (max(keys), max(x), y, n)
+                group = self.layout(wavelane, depth + 1, **kwargs)
+                lane = LaneLayout(
+                    wavetitle, "group", group.height, group.width, group.title_width, group
+                )
+                layout.attributes += group.attributes
+                layout.groups += 1 + group.groups
+            lane.y = layout.height
+            if lane.group is None:
+                layout.y_steps.append((lane.dy, False))
+            else:
+                layout.y_steps.extend(lane.group.y_steps)
+            layout.lanes.append(lane)
+            layout.width = max(layout.width, lane.length)
+            layout.title_width = max(layout.title_width, lane.title_width)
+            layout.height += lane.dy
+        return layout
+
+    def size(self, wavelanes, depth: int = 1, **kwargs):
+        """
+        Estimate the size of the image from the layout of the waveforms.
+        The layout of the drawing is kept in the render context to be
+        reused by wavegroup()
+
+        Args:
+            wavelanes (Dict[str, dict]): named waveforms composing the group
+            depth (int) : depth of nested groups to represent hierarchy
+        Parameters:
+            config (Dict[str, Any]): config section of the input file
+            brick_width (float): width of a brick, default is 20.0
+            brick_height (float): height of a brick, default is 20.0
+        Returns:
+            width of the names, width of the waveforms, height, and
+            number of lines of register attributes
+        """
+        layout = self.layout(wavelanes, depth, **kwargs)
+        if layout is None:
+            return (0, 0, 0, 0)
+        if depth == 1:
+            self.context.layout = layout
+        return (layout.title_width, layout.width, layout.height, layout.attributes)
 
     def draw(self, wavelanes, **kwargs) -> str:
         """
@@ -960,5 +1226,7 @@ class Renderer:
             is_reg (bool):
                 if True `wavelanes` given represents a register
                 otherwise it represents a bunch of signals
+            context (RenderContext, optional): state of the drawing, new one by default
+            stylesheet (dict, optional): css rules, by default the global style
         """
         raise NotImplementedError()
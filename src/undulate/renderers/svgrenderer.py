@@ -3,9 +3,9 @@ svgrenderer.py use the logic of renderer.py to render waveforms
 into scalable vector graphics format
 """
 
+import os
 import html
 from undulate.skin import (
-    DEFAULT_STYLE,
     DEFINITION,
     Engine,
     style_in_kwargs,
@@ -22,16 +22,76 @@ from typing import List
 class SvgRenderer(Renderer):
     """
     Render the wavelanes as an svg
+
+    Attributes:
+        sink (io.TextIOBase): stream in which fragments are written as soon as
+            they are produced while drawing, None to return them as strings
+        overloads (Dict[str, str]): css class generated for each distinct
+            style overload of the elements
+        symbols (bool): draw each distinct brick once in <defs> and refer to it
+            with <use> elements, by default False
+        bricks (Dict[str, str]): identifier of the definition of each distinct
+            brick content when symbols is True
     """
 
     def __init__(self, **kwargs):
         Renderer.__init__(self)
         self.engine = Engine.SVG
+        self.sink = None
+        self.overloads = {}
+        self.symbols = bool(kwargs.get("symbols", False))
+        self.bricks = {}
+
+    def classes(self, style_repr: str, overload: dict) -> str:
+        """
+        css classes of an element: its rule and the class shared by all
+        elements with the same style overload
+
+        Args:
+            style_repr (str): css rule of the element
+            overload (dict): properties overloading the rule
+        """
+        css = css_from_rule(None, overload, False)
+        if not css:
+            return style_repr or ""
+        name = self.overloads.get(css)
+        if name is None:
+            name = self.overloads[css] = "ovl-%d" % len(self.overloads)
+        return "%s %s" % (style_repr, name) if style_repr else name
+
+    def css_from_overloads(self) -> str:
+        """rules of the css classes generated for the style overloads"""
+        return "\n".join(
+            (".%s {%s}" % (name, css) for css, name in self.overloads.items())
+        )
+
+    def emit(self, fragment: str) -> str:
+        """
+        Write the fragment into the sink if any
+
+        Args:
+            fragment (str): drawing instructions in the order of the document
+        """
+        if self.sink is None:
+            return fragment
+        self.sink.write(fragment)
+        return ""
 
     def _SYMBOL_TEMP(self, *args, **kwargs):
         symbol, content = args
         extra = kwargs.get("extra", "")
         style = kwargs.get("style", "")
+        if self.symbols:
+            # identical geometry and style share the same definition
+            name = self.bricks.get(content)
+            if name is None:
+                name = self.bricks[content] = "brick-%d" % len(self.bricks)
+            return '<use xlink:href="#%s" data-symbol="%s" %s class="%s"/>\n' % (
+                name,
+                symbol,
+                extra,
+                style,
+            )
         return '<g data-symbol="%s" %s class="%s">\n%s</g>\n' % (
             symbol,
             extra,
@@ -39,6 +99,15 @@ class SvgRenderer(Renderer):
             content,
         )
 
+    def defs_from_bricks(self) -> str:
+        """definitions of the distinct bricks referred by <use> elements"""
+        return "".join(
+            (
+                '<g id="%s">\n%s</g>\n' % (name, content)
+                for content, name in self.bricks.items()
+            )
+        )
+
     def group(self, callback, identifier: str, **kwargs) -> str:
         """
         Group some drawable together
@@ -50,9 +119,11 @@ class SvgRenderer(Renderer):
         classes = " ".join(kwargs.get("classes", []))
         if classes:
             classes = 'class="' + classes + '"'
-        ans = '<g id="%s" %s %s >\n' % (identifier, classes, kwargs.get("extra", ""))
-        ans += callback()
-        ans += "</g>\n"
+        ans = self.emit(
+            '<g id="%s" %s %s >\n' % (identifier, classes, kwargs.get("extra", ""))
+        )
+        ans += self.emit(callback())
+        ans += self.emit("</g>\n")
         return ans
 
     def path(self, vertices: List[Point], **kwargs) -> str:
@@ -69,10 +140,9 @@ class SvgRenderer(Renderer):
         overload["fill"] = None
         path = "".join(["L%f,%f " % (v.x, v.y) for v in vertices])
         path = "M" + path[1:]
-        return '<path d="%s" class="%s" style="%s" />\n' % (
+        return '<path d="%s" class="%s" />\n' % (
             path.strip(),
-            kwargs.get("style_repr", ""),
-            css_from_rule(None, overload, False),
+            self.classes(kwargs.get("style_repr", ""), overload),
         )
 
     def arrow(self, arrow_description: ArrowDescription, **kwargs) -> str:
@@ -95,8 +165,7 @@ class SvgRenderer(Renderer):
         return (
             '<path d="M-3.5 -3.5 L0 3.5 L3.5 -3.5 L0 -2 L-3.5 -3.5" '
             + transform
-            + 'class="%s" style="%s"/>\n'
-            % (style_repr, css_from_rule(None, overload, False))
+            + 'class="%s"/>\n' % self.classes(style_repr, overload)
         )
 
     def polygon(self, vertices: List[Point], **kwargs) -> str:
@@ -115,15 +184,12 @@ class SvgRenderer(Renderer):
             extra = ""
         if callable(extra):
             extra = extra()
-        ans = '<polygon points="'
-        for v in vertices:
-            ans += "%f, %f " % (v.x, v.y)
-        ans += '" class="%s" style="%s" %s/>\n' % (
-            style,
-            css_from_rule(None, overload, False),
+        points = "".join(["%f, %f " % (v.x, v.y) for v in vertices])
+        return '<polygon points="%s" class="%s" %s/>\n' % (
+            points,
+            self.classes(style, overload),
             extra,
         )
-        return ans
 
     def spline(self, vertices: List[SplineSegment], **kwargs) -> str:
         """
@@ -140,10 +206,9 @@ class SvgRenderer(Renderer):
         path = "".join(
             ["%s%f,%f " % (v.order, v.x, v.y) if v.order != "z" else "z" for v in vertices]
         )
-        return '<path d="%s" class="%s" style="%s"/>\n' % (
+        return '<path d="%s" class="%s"/>\n' % (
             path.strip(),
-            kwargs.get("style_repr", "path"),
-            css_from_rule(None, overload, False),
+            self.classes(kwargs.get("style_repr", "path"), overload),
         )
 
     def text(self, x: float, y: float, text: str = "", **kwargs) -> str:
@@ -157,16 +222,15 @@ class SvgRenderer(Renderer):
         Parameters:
             style_repr (optional str) : css rule, by default 'text'
         """
-        css = kwargs.get("style_repr", "text")
         overload = style_in_kwargs(**kwargs)
         overload["stroke"] = None
+        css = self.classes(kwargs.get("style_repr", "text"), overload)
         if css:
             css = 'class="%s"' % css
-        return '<text x="%f" y="%f" %s style="%s">%s</text>\n' % (
+        return '<text x="%f" y="%f" %s>%s</text>\n' % (
             x,
             y,
             css,
-            css_from_rule(None, overload, False),
             html.escape(str(text)),
         )
 
@@ -179,47 +243,83 @@ class SvgRenderer(Renderer):
 
         Args:
             wavelanes (dict): parsed dictionary from the input file
-            id (str)  : file name of the output generated file
+            id (str)  : identifier of the root group
+            filename (str)  : file name of the output generated file
+            output (io.TextIOBase, optional): stream written instead of filename
             brick_width (int): by default 40
             brick_height (int): by default 20
             is_reg (bool):
                 if True `wavelanes` given represents a register
                 otherwise it represents a bunch of signals
+            context (RenderContext, optional): state of the drawing, new one by default
+            stylesheet (dict, optional): css rules, by default the global style
+            symbols (bool, optional): reuse identical bricks with <use> elements
         """
         _id = kwargs.get("id", "a")
         filename = kwargs.get("filename", False)
         brick_width = kwargs.get("brick_width", 40)
         brick_height = kwargs.get("brick_height", 20)
         is_reg = kwargs.get("is_reg", False)
+        context = self.new_context(**kwargs)
         lkeys, width, height, n = self.size(wavelanes, **kwargs)
         # remove offset for the name in register
         if is_reg:
             height += (n + 1) * 12
         # consider padding of root
-        root_style = get_style("root")
+        root_style = get_style("root", stylesheet=context.stylesheet)
         val_top, unit_top = root_style.get("padding-top", (0.0, SizeUnit.PX))
         val_bot, unit_bot = root_style.get("padding-bottom", (0.0, SizeUnit.PX))
         height += (val_top * unit_top.value) + (val_bot * unit_bot.value)
-        with open(filename, "w+") as fp:
-            fp.write(
+        self.overloads = {}
+        self.bricks = {}
+        self.symbols = kwargs.get("symbols", self.symbols)
+        output, tmp_path = kwargs.get("output"), None
+        if output is None:
+            # a failed drawing shall not leave a truncated file behind
+            tmp_path = "%s.%d.tmp" % (filename, os.getpid())
+            output = open(tmp_path, "w+")
+        try:
+            output.write(
                 '<svg xmlns="http://www.w3.org/2000/svg" width="%f" height="%f" '
                 % (width + lkeys + 11, height)
             )
-            fp.write('viewBox="-1 -1 %f %f">\n' % (width + lkeys + 1, height))
-            fp.write("<style>\n")
-            fp.write(css_from_style(DEFAULT_STYLE))
-            fp.write("\n.wave {mask: url(#wavezone);}\n")
-            fp.write("</style>\n")
-            fp.write(DEFINITION.format(int(lkeys), int(width), int(height)))
-            fp.write(
-                self.wavegroup(
-                    _id,
-                    wavelanes,
-                    brick_width=brick_width,
-                    brick_height=brick_height,
-                    width=width,
-                    height=height,
-                    offsetx=lkeys,
-                )[1]
+            if self.symbols:
+                output.write('xmlns:xlink="http://www.w3.org/1999/xlink" ')
+            output.write('viewBox="-1 -1 %f %f">\n' % (width + lkeys + 1, height))
+            output.write("<style>\n")
+            output.write(css_from_style(context.stylesheet))
+            output.write("\n.wave {mask: url(#wavezone);}\n")
+            output.write("</style>\n")
+            output.write(DEFINITION.format(int(lkeys), int(width), int(height)))
+            # fragments are written as soon as they are drawn
+            self.sink = output
+            self.wavegroup(
+                _id,
+                wavelanes,
+                brick_width=brick_width,
+                brick_height=brick_height,
+                width=width,
+                height=height,
+                offsetx=lkeys,
             )
-            fp.write("\n</svg>")
+            # bricks referred by <use> elements while drawing
+            if self.bricks:
+                output.write("\n<defs>\n")
+                output.write(self.defs_from_bricks())
+                output.write("</defs>")
+            # shared classes of style overloads discovered while drawing
+            if self.overloads:
+                output.write("\n<style>\n")
+                output.write(self.css_from_overloads())
+                output.write("\n</style>")
+            output.write("\n</svg>")
+        except BaseException:
+            if tmp_path is not None:
+                output.close()
+                os.remove(tmp_path)
+            raise
+        finally:
+            self.sink = None
+        if tmp_path is not None:
+            output.close()
+            os.replace(tmp_path, filename)
@@ -271,11 +271,14 @@ class TermRenderer(Renderer):
             is_reg (bool):
                 if True `wavelanes` given represents a register
                 otherwise it represents a bunch of signals
+            context (RenderContext, optional): state of the drawing, new one by default
+            stylesheet (dict, optional): css rules, by default the global style
         """
         _id = kwargs.get("id", "")
         brick_width = kwargs.get("brick_width", 40)
         brick_height = kwargs.get("brick_height", 20)
         eol = kwargs.get("eol", "\n")
+        context = self.new_context(**kwargs)
         # remove group not used for waveform
         wavelanes.pop("annotations", None)
         wavelanes.pop("edges", None)
@@ -283,7 +286,9 @@ class TermRenderer(Renderer):
         wavelanes.pop("config", None)
         lkeys, width, height, n = self.size(wavelanes, **kwargs)
         test_text = "abcdghijmnopz"
-        _, _, tw, _ = text_bbox(None, "title", test_text, None)
+        _, _, tw, _ = text_bbox(
+            None, "title", test_text, None, stylesheet=context.stylesheet
+        )
         lkeys = lkeys / tw * len(test_text)
         self.draw_width = width
         self.offsetx = int(lkeys + self.depth(wavelanes) * 1.75)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+
+"""
+Render server drawing the waveforms requested over http
+
+A long-lived process loads plugins and style once and spreads the
+renderings over a pool of workers. Clients post a json object such as
+
+    {"input": "...", "format": "yaml", "engine": "svg", "dpi": 150,
+     "is_reg": false, "style": "..."}
+
+to /render and receive the rendered file.
+"""
+
+import io
+import os
+import json
+import signal
+import hashlib
+import argparse
+import threading
+import socketserver
+import concurrent.futures
+
+import undulate.cli as cli
+import undulate.logger as log
+import undulate.skin as skin
+
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple, Union
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8421
+CACHE_ENTRIES = 256
+MAX_REQUEST_SIZE = 4 * 1024 * 1024
+TIMEOUT = 10.0
+MIME_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "pdf": "application/pdf",
+    "eps": "application/postscript",
+}
+REQUEST_DEFAULTS = {
+    "format": "json",
+    "engine": "svg",
+    "dpi": 150.0,
+    "is_reg": False,
+    "style": None,
+}
+
+
+class RenderTimeout(BaseException):
+    """
+    raised in a worker when a rendering takes too long
+
+    it does not derive from Exception to go through the error handling
+    of the rendering
+    """
+
+
+class BadRequest(Exception):
+    """invalid request sent by a client"""
+
+
+def _raise_timeout(signum, frame) -> None:
+    raise RenderTimeout()
+
+
+def _raise_interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt()
+
+
+def _worker_initializer(style: Optional[str]) -> None:
+    """load once per worker what is common to all requests"""
+    cli.load_bricks()
+    cli.load_style(style)
+    # the server process alone handles the interruptions
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _raise_timeout)
+
+
+def check_request(request: dict) -> dict:
+    """
+    validate a request and complete it with the default values
+
+    Raises:
+        BadRequest: the request cannot be rendered
+    """
+    if not isinstance(request, dict) or not isinstance(request.get("input"), str):
+        raise BadRequest("the request shall be an object with an 'input' string")
+    unknown = set(request) - set(REQUEST_DEFAULTS) - {"input"}
+    if unknown:
+        raise BadRequest("unknown fields: %s" % ", ".join(sorted(unknown)))
+    request = {**REQUEST_DEFAULTS, **request}
+    config = cli.load_config()
+    if request["format"] not in config.get("extensions", {}):
+        raise BadRequest(log.UNSUPPORTED_FORMAT % log.list_vars(config["extensions"]))
+    # only the engines generating a file can answer a request
+    if request["engine"] not in cli.file_engines():
+        raise BadRequest(log.UNSUPPORTED_ENGINE % log.list_vars(cli.file_engines()))
+    try:
+        request["dpi"] = float(request["dpi"])
+    except (TypeError, ValueError):
+        raise BadRequest("dpi shall be a number")
+    if not isinstance(request["is_reg"], bool):
+        raise BadRequest("is_reg shall be a boolean")
+    if request["style"] is not None and not isinstance(request["style"], str):
+        raise BadRequest("style shall be a css string")
+    return request
+
+
+def request_key(request: dict) -> str:
+    """hash identifying the output of a checked request"""
+    content = json.dumps(request, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def render_request(request: dict, timeout: float) -> Tuple[int, Union[bytes, str]]:
+    """
+    render a checked request in a worker
+
+    Returns:
+        the http status code and the rendered file, or the error message
+    """
+    if hasattr(signal, "SIGALRM"):
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        stylesheet = None
+        if request["style"]:
+            stylesheet = dict(skin.default_style())
+            tokens = skin.css_tokenizer(io.StringIO(request["style"]))
+            stylesheet.update(skin.css_parser(tokens))
+        _, obj = cli.load_parser(request["format"]).loads(request["input"])
+        if not obj:
+            log.fatal(log.FILE_EMPTY)
+        payload = cli.render(
+            obj,
+            request["engine"],
+            request["is_reg"],
+            request["dpi"],
+            stylesheet=stylesheet,
+        )
+        return HTTPStatus.OK, payload
+    except RenderTimeout:
+        return HTTPStatus.GATEWAY_TIMEOUT, "rendering exceeded %.1fs" % timeout
+    except log.FatalError as e:
+        return HTTPStatus.BAD_REQUEST, e.msg
+    except Exception as e:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, f"{e.__class__.__name__}: {e}"
+    finally:
+        if hasattr(signal, "SIGALRM"):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class RenderService:
+    """
+    pool of workers rendering the requests with a cache of the last outputs
+
+    A worker stops a rendering longer than the timeout with SIGALRM. Where
+    SIGALRM does not exist, as on Windows, a client still gets an answer
+    after the timeout but the rendering goes on and keeps its worker busy.
+
+    Args:
+        jobs (int): number of worker processes, by default the number of cpus
+        timeout (float): maximum time in seconds spent on a request
+        cache_entries (int): number of rendered outputs kept in memory
+        style (str): css file overloading the default style
+    """
+
+    def __init__(
+        self,
+        jobs: Optional[int] = None,
+        timeout: float = TIMEOUT,
+        cache_entries: int = CACHE_ENTRIES,
+        style: Optional[str] = None,
+    ) -> None:
+        self.jobs = jobs
+        self.style = style
+        self.timeout = timeout
+        self.cache_entries = cache_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = self.new_pool()
+
+    def new_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.jobs, initializer=_worker_initializer, initargs=(self.style,)
+        )
+
+    def render(self, request: dict) -> Tuple[int, Union[bytes, str], bool]:
+        """
+        render a request or get it from the cache
+
+        Returns:
+            the http status code, the rendered file or the error message,
+            and if the output comes from the cache
+        """
+        request = check_request(request)
+        key = request_key(request)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return HTTPStatus.OK, self.cache[key], True
+        pool = self.pool
+        try:
+            future = pool.submit(render_request, request, self.timeout)
+            # the worker stops itself on time, this is for the pool being busy
+            status, payload = future.result(timeout=self.timeout + 1.0)
+        except concurrent.futures.TimeoutError:
+            # only drops a request still waiting for a worker, a running
+            # rendering is stopped by the worker itself
+            future.cancel()
+            message = "rendering exceeded %.1fs" % self.timeout
+            return HTTPStatus.GATEWAY_TIMEOUT, message, False
+        except BrokenProcessPool:
+            # a worker died (crash, out of memory), the next requests get
+            # a new pool
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = self.new_pool()
+            pool.shutdown(wait=False)
+            message = "a worker stopped unexpectedly"
+            return HTTPStatus.INTERNAL_SERVER_ERROR, message, False
+        if status == HTTPStatus.OK and self.cache_entries > 0:
+            with self.lock:
+                self.cache[key] = payload
+                while len(self.cache) > self.cache_entries:
+                    self.cache.popitem(last=False)
+        return status, payload, False
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """
+    http interface of the render service
+
+    GET  /engines  list the engines usable in a request
+    POST /render   render the json request in the body
+    """
+
+    server_version = "undulate"
+
+    def address_string(self) -> str:
+        # clients of a unix socket have no address
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return "unix"
+
+    def send(self, status: int, payload: Union[bytes, str], mime: str, **headers) -> None:
+        if isinstance(payload, str):
+            payload = (payload + "\n").encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if self.path != "/engines":
+            self.send(HTTPStatus.NOT_FOUND, "unknown path %s" % self.path, "text/plain")
+            return
+        self.send(HTTPStatus.OK, json.dumps(cli.file_engines()), "application/json")
+
+    def do_POST(self) -> None:
+        if self.path != "/render":
+            self.send(HTTPStatus.NOT_FOUND, "unknown path %s" % self.path, "text/plain")
+            return
+        if self.headers.get("Content-Length") is None:
+            self.send(HTTPStatus.LENGTH_REQUIRED, "Content-Length required", "text/plain")
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+            if length < 0:
+                raise BadRequest("invalid Content-Length")
+            if length > MAX_REQUEST_SIZE:
+                status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                self.send(status, "request too large", "text/plain")
+                return
+            request = json.loads(self.rfile.read(length))
+            status, payload, cached = self.server.service.render(request)
+        except (ValueError, BadRequest) as e:
+            self.send(HTTPStatus.BAD_REQUEST, str(e), "text/plain")
+            return
+        if status != HTTPStatus.OK:
+            self.send(status, payload, "text/plain")
+            return
+        ext = cli.load_config()["engines"][request.get("engine", "svg")]["extension"]
+        self.send(
+            status,
+            payload,
+            MIME_TYPES.get(ext, "application/octet-stream"),
+            X_Undulate_Cache="hit" if cached else "miss",
+        )
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """http server listening on a unix socket"""
+
+    daemon_threads = True
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    unix_socket: Optional[str] = None,
+    **kwargs,
+) -> None:
+    """
+    answer the render requests until interrupted
+
+    Args:
+        host (str): address to listen to
+        port (int): port to listen to
+        unix_socket (str): path of a unix socket used instead of host and port
+        kwargs: parameters of the RenderService
+    """
+    service = RenderService(**kwargs)
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixHTTPServer(unix_socket, RenderHandler)
+        address = unix_socket
+    else:
+        server = ThreadingHTTPServer((host, port), RenderHandler)
+        address = "http://%s:%d" % (host, port)
+    server.service = service
+    # stop as cleanly when terminated by a service manager
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    print(f"Serving on {address} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="undulate serve", description="render server of waveforms"
+    )
+    parser.add_argument("--host", help="address to listen to", default=DEFAULT_HOST)
+    parser.add_argument(
+        "--port", help="port to listen to", default=DEFAULT_PORT, type=int
+    )
+    parser.add_argument(
+        "--unix", help="path of a unix socket to listen to", default=None, type=str
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of worker processes (default: number of cpus)",
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        help="maximum time in seconds to render a request (requires SIGALRM)",
+        default=None,
+        type=float,
+    )
+    parser.add_argument(
+        "--cache-entries",
+        help="number of rendered outputs kept in memory",
+        default=CACHE_ENTRIES,
+        type=int,
+    )
+    parser.add_argument(
+        "-s", "--style", help="path to custom css file", default=None, type=str
+    )
+    cli_args = parser.parse_args(args)
+    # without SIGALRM, a running rendering cannot be stopped
+    if cli_args.timeout is not None and not hasattr(signal, "SIGALRM"):
+        parser.error("--timeout is not supported on this platform")
+    serve(
+        cli_args.host,
+        cli_args.port,
+        cli_args.unix,
+        jobs=cli_args.jobs,
+        timeout=TIMEOUT if cli_args.timeout is None else cli_args.timeout,
+        cache_entries=cli_args.cache_entries,
+        style=cli_args.style,
+    )
+
+
+if __name__ == "__main__":
+    main()
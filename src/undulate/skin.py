@@ -13,6 +13,7 @@ import os
 import re
 import sys
 from enum import Enum
+from types import MappingProxyType
 
 
 class Engine(Enum):
@@ -344,7 +345,47 @@ def css_load(filepath: str):
 
 
 # style definition for cairo renderer
-DEFAULT_STYLE = css_load(os.path.join(os.path.dirname(__file__), "default.css"))
+DEFAULT_CSS = os.path.join(os.path.dirname(__file__), "default.css")
+_DEFAULT_STYLE = None
+# resolved styles of get_style, dropped when the generation changes
+RESOLVED_ENTRIES = 4096
+_GENERATION = 0
+_RESOLVED = {}
+_RESOLVED_SHEETS = {}
+_RESOLVED_GENERATION = 0
+
+
+def default_style() -> dict:
+    """global stylesheet, parsed from default.css on first use"""
+    global _DEFAULT_STYLE
+    if _DEFAULT_STYLE is None:
+        _DEFAULT_STYLE = css_load(DEFAULT_CSS)
+    return _DEFAULT_STYLE
+
+
+def invalidate_styles() -> None:
+    """
+    forget the resolved styles, to be called when a stylesheet
+    already used for a drawing is modified
+    """
+    global _GENERATION
+    _GENERATION += 1
+
+
+def _freeze(overload: dict) -> tuple:
+    """hashable equivalent of the overload of a style"""
+    return tuple(
+        (prop, tuple(value) if isinstance(value, list) else value)
+        for prop, value in overload.items()
+    )
+
+
+def __getattr__(name: str):
+    # DEFAULT_STYLE is still available as an attribute of the module
+    if name == "DEFAULT_STYLE":
+        return default_style()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
 
 DEFINITION = """
 <defs>
@@ -367,189 +408,232 @@ DEFINITION = """
 </defs>
 """
 
-try:
+
+# cairo is only imported by the functions of the cairo engine
+def apply_cairo_style(context, name: str, overload: dict, stylesheet: dict = None):
+    """
+    read the style and apply via cairo functions
+    """
+    style = get_style(name, overload, stylesheet)
+    apply_cairo_font(context, style, {})
+    apply_cairo_fill(context, style, {})
+    apply_cairo_stroke(context, style, {})
+
+
+def apply_cairo_fill(context, style: dict, overload: dict):
+    """
+    set the fill color found in the style
+    """
+    if overload:
+        style = {**style, **overload}
+    # color
+    t = style.get("fill", None)
+    if t is not None:
+        r, g, b, a = t
+        context.set_source_rgba(r / 255, g / 255, b / 255, a / 255)
+
+
+def apply_cairo_stroke(context, style: dict, overload: dict):
+    """
+    support width, color, linecap, linejoin, dash
+    """
     import cairo
-except ImportError:
-    pass
-else:
-
-    def apply_cairo_style(context, name: str, overload: dict):
-        """
-        read the style and apply via cairo functions
-        """
-        style = get_style(name)
-        apply_cairo_font(context, style, overload)
-        apply_cairo_fill(context, style, overload)
-        apply_cairo_stroke(context, style, overload)
-
-    def apply_cairo_fill(context, style: dict, overload: dict):
-        """
-        set the fill color found in the style
-        """
-        style = dict(style)
-        style.update(overload)
-        # color
-        t = style.get("fill", None)
-        if t is not None:
-            r, g, b, a = t
-            context.set_source_rgba(r / 255, g / 255, b / 255, a / 255)
-
-    def apply_cairo_stroke(context, style: dict, overload: dict):
-        """
-        support width, color, linecap, linejoin, dash
-        """
-        style = dict(style)
-        style.update(overload)
-        # color
-        t = style.get("stroke", None)
-        if t is not None:
-            r, g, b, a = t
-            context.set_source_rgba(r / 255, g / 255, b / 255, a / 255)
-        # width
-        w = style.get("stroke-width", 1.0)
-        context.set_line_width(w)
-        # line cap
-        lc = style.get("stroke-linecap", LineCap.ROUND)
-        if lc == LineCap.SQUARE:
-            context.set_line_cap(cairo.LINE_CAP_SQUARE)
-        elif lc == LineCap.BUTT:
-            context.set_line_cap(cairo.LINE_CAP_BUTT)
-        else:
-            context.set_line_cap(cairo.LINE_CAP_ROUND)
-        # line join
-        lj = style.get("stroke-linejoin", LineJoin.MITER)
-        if lj == LineJoin.BEVEL:
-            context.set_line_join(cairo.LINE_JOIN_BEVEL)
-        elif lj == LineJoin.ROUND:
-            context.set_line_join(cairo.LINE_JOIN_ROUND)
-        else:
-            context.set_line_join(cairo.LINE_JOIN_MITER)
-        # dash array
-        da = style.get("stroke-dasharray", [])
-        of = style.get("stroke-dasharray-offset", 0)
-        if da:
-            context.set_dash(da, of)
-
-    def cairo_text_align(context, style: dict, text: str):
-        """
-        offset calculation for text alignment
-        """
-        ta = style.get("text-align", TextAlign.CENTER)
-        ba = style.get("dominant-baseline", "middle")
-        # get text width
-        ascent, descent, _height, max_x_advance, max_y_advance = context.font_extents()
-        xbearing, ybearing, width, height, xadvance, yadvance = context.text_extents(text)
-        # apply style
-        dy = descent / 2 + height / 4 if ba == "middle" else 0
-        if ta == TextAlign.LEFT:
-            return (0, -dy)
-        if ta == TextAlign.RIGHT:
-            return (width, -dy)
-        return (width / 2, -dy)
-
-    def cairo_text_bbox(context, style: dict, text: str):
-        """
-        return size of the text for a given font
-        """
-        ta = style.get("text-align", TextAlign.CENTER)
-        # get text width
-        ascent, descent, _height, max_x_advance, max_y_advance = context.font_extents()
-        xbearing, ybearing, width, height, xadvance, yadvance = context.text_extents(text)
-        width += SizeUnit.EM.value / 2
-        if ta == TextAlign.LEFT:
-            return (0, -height / 2, width, _height)
-        elif ta == TextAlign.RIGHT:
-            return (-width, -height / 2, width, _height)
-        return (-width / 2, -descent - height / 2, width, _height)
-
-    def apply_cairo_font(context, style: dict, overload: dict):
-        """
-        get font information from the style and apply
-        support font family, bold, italic, normal, size
-        """
-        style = dict(style)
-        style.update(overload)
-        # font slant
-        font_style = style.get("font-style", "")
-        if "it" in font_style:
-            font_style = cairo.FONT_SLANT_ITALIC
-        elif "ob" in font_style:
-            font_style = cairo.FONT_SLANT_OBLIQUE
-        else:
-            font_style = cairo.FONT_SLANT_NORMAL
-        # normal or bold
-        w = style.get("font-weight", 200)
-        if isinstance(w, str) and "bold" in w:
-            font_weight = cairo.FONT_WEIGHT_BOLD
-        elif isinstance(w, int) and w > 400:
-            font_weight = cairo.FONT_WEIGHT_BOLD
-        else:
-            font_weight = cairo.FONT_WEIGHT_NORMAL
-        # fetch font family
-        font_family = style.get("font-family", None)
-        if font_family is not None and isinstance(font_family, str):
-            context.select_font_face(font_family, font_style, font_weight)
-        # font size
-        font_size = style.get("font-size", None)
-        if font_size is not None:
-            s, u = font_size
-            context.set_font_size(s * u.value)
 
+    if overload:
+        style = {**style, **overload}
+    # color
+    t = style.get("stroke", None)
+    if t is not None:
+        r, g, b, a = t
+        context.set_source_rgba(r / 255, g / 255, b / 255, a / 255)
+    # width
+    w = style.get("stroke-width", 1.0)
+    context.set_line_width(w)
+    # line cap
+    lc = style.get("stroke-linecap", LineCap.ROUND)
+    if lc == LineCap.SQUARE:
+        context.set_line_cap(cairo.LINE_CAP_SQUARE)
+    elif lc == LineCap.BUTT:
+        context.set_line_cap(cairo.LINE_CAP_BUTT)
+    else:
+        context.set_line_cap(cairo.LINE_CAP_ROUND)
+    # line join
+    lj = style.get("stroke-linejoin", LineJoin.MITER)
+    if lj == LineJoin.BEVEL:
+        context.set_line_join(cairo.LINE_JOIN_BEVEL)
+    elif lj == LineJoin.ROUND:
+        context.set_line_join(cairo.LINE_JOIN_ROUND)
+    else:
+        context.set_line_join(cairo.LINE_JOIN_MITER)
+    # dash array
+    da = style.get("stroke-dasharray", [])
+    of = style.get("stroke-dasharray-offset", 0)
+    if da:
+        context.set_dash(da, of)
+
+
+def cairo_text_align(context, style: dict, text: str):
+    """
+    offset calculation for text alignment
+    """
+    ta = style.get("text-align", TextAlign.CENTER)
+    ba = style.get("dominant-baseline", "middle")
+    # get text width
+    ascent, descent, _height, max_x_advance, max_y_advance = context.font_extents()
+    xbearing, ybearing, width, height, xadvance, yadvance = context.text_extents(text)
+    # apply style
+    dy = descent / 2 + height / 4 if ba == "middle" else 0
+    if ta == TextAlign.LEFT:
+        return (0, -dy)
+    if ta == TextAlign.RIGHT:
+        return (width, -dy)
+    return (width / 2, -dy)
+
+
+def cairo_text_bbox(context, style: dict, text: str):
+    """
+    return size of the text for a given font
+    """
+    ta = style.get("text-align", TextAlign.CENTER)
+    # get text width
+    ascent, descent, _height, max_x_advance, max_y_advance = context.font_extents()
+    xbearing, ybearing, width, height, xadvance, yadvance = context.text_extents(text)
+    width += SizeUnit.EM.value / 2
+    if ta == TextAlign.LEFT:
+        return (0, -height / 2, width, _height)
+    elif ta == TextAlign.RIGHT:
+        return (-width, -height / 2, width, _height)
+    return (-width / 2, -descent - height / 2, width, _height)
+
+
+def apply_cairo_font(context, style: dict, overload: dict):
+    """
+    get font information from the style and apply
+    support font family, bold, italic, normal, size
+    """
+    import cairo
 
-def apply_fill(context, name: str, engine: Engine, overload: dict = {}):
+    if overload:
+        style = {**style, **overload}
+    # font slant
+    font_style = style.get("font-style", "")
+    if "it" in font_style:
+        font_style = cairo.FONT_SLANT_ITALIC
+    elif "ob" in font_style:
+        font_style = cairo.FONT_SLANT_OBLIQUE
+    else:
+        font_style = cairo.FONT_SLANT_NORMAL
+    # normal or bold
+    w = style.get("font-weight", 200)
+    if isinstance(w, str) and "bold" in w:
+        font_weight = cairo.FONT_WEIGHT_BOLD
+    elif isinstance(w, int) and w > 400:
+        font_weight = cairo.FONT_WEIGHT_BOLD
+    else:
+        font_weight = cairo.FONT_WEIGHT_NORMAL
+    # fetch font family
+    font_family = style.get("font-family", None)
+    if font_family is not None and isinstance(font_family, str):
+        context.select_font_face(font_family, font_style, font_weight)
+    # font size
+    font_size = style.get("font-size", None)
+    if font_size is not None:
+        s, u = font_size
+        context.set_font_size(s * u.value)
+
+
+def apply_fill(
+    context, name: str, engine: Engine, overload: dict = {}, stylesheet: dict = None
+):
     """
     apply fill from 'name' of the selector
     for the supported engine
     """
     if engine == Engine.CAIRO:
-        apply_cairo_fill(context, get_style(name), overload)
+        apply_cairo_fill(context, get_style(name, overload, stylesheet), {})
 
 
-def apply_stroke(context, name: str, engine: Engine, overload: dict = {}):
+def apply_stroke(
+    context, name: str, engine: Engine, overload: dict = {}, stylesheet: dict = None
+):
     """
     apply stroke from 'name' of the selector
     for the supported engine
     """
     if engine == Engine.CAIRO:
-        apply_cairo_stroke(context, get_style(name), overload)
+        apply_cairo_stroke(context, get_style(name, overload, stylesheet), {})
 
 
-def apply_font(context, name: str, engine: Engine, overload: dict = {}):
+def apply_font(
+    context, name: str, engine: Engine, overload: dict = {}, stylesheet: dict = None
+):
     """
     apply font from 'name' of the selector
     for the supported engine
     """
     if engine == Engine.CAIRO:
-        apply_cairo_font(context, get_style(name), overload)
+        apply_cairo_font(context, get_style(name, overload, stylesheet), {})
 
 
-def get_style(name: str, overload: dict = {}) -> dict:
+def get_style(name: str, overload: dict = {}, stylesheet: dict = None) -> dict:
     """
     get the style from the selector rules and
-    fallback to a closest match in the default style
+    fallback to a closest match in the stylesheet
+    (by default the global DEFAULT_STYLE)
+
+    the resolved styles are memoized by stylesheet, selector and overload
+    and returned read-only: a stylesheet modified after its first use
+    requires a call to invalidate_styles
     """
-    selectors = DEFAULT_STYLE.keys()
-    rule = name if name in selectors else name.split(" ")[0] if " " in name else ""
-    style = dict(DEFAULT_STYLE.get(rule, {}))
+    global _RESOLVED_GENERATION
+    if stylesheet is None:
+        stylesheet = default_style()
+    if _RESOLVED_GENERATION != _GENERATION or len(_RESOLVED) >= RESOLVED_ENTRIES:
+        _RESOLVED.clear()
+        _RESOLVED_SHEETS.clear()
+        _RESOLVED_GENERATION = _GENERATION
+    key = (id(stylesheet), name, tuple(overload.items()) if overload else ())
+    try:
+        return _RESOLVED[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # lists such as a dash array are not hashable
+        key = (id(stylesheet), name, _freeze(overload))
+        if key in _RESOLVED:
+            return _RESOLVED[key]
+    rule = name if name in stylesheet else name.split(" ")[0] if " " in name else ""
+    style = dict(stylesheet.get(rule, {}))
     style.update(overload)
+    style = MappingProxyType(style)
+    _RESOLVED[key] = style
+    # keep the stylesheet alive so that its id is not reused
+    _RESOLVED_SHEETS[id(stylesheet)] = stylesheet
     return style
 
 
-def text_align(context, name: str, text: str, engine: Engine):
+def text_align(context, name: str, text: str, engine: Engine, stylesheet: dict = None):
     """
     calculate the offset to apply for the text alignment
     """
     if engine == Engine.CAIRO:
-        return cairo_text_align(context, get_style(name), text)
+        return cairo_text_align(context, get_style(name, stylesheet=stylesheet), text)
 
 
-def text_bbox(context, name: str, text: str, engine: Engine, overload: dict = {}):
+def text_bbox(
+    context,
+    name: str,
+    text: str,
+    engine: Engine,
+    overload: dict = {},
+    stylesheet: dict = None,
+):
     """
     calculate the bounding box of the text
     """
-    style = get_style(name)
+    style = get_style(name, stylesheet=stylesheet)
     if engine == Engine.CAIRO:
-        apply_cairo_style(context, name, overload)
+        apply_cairo_style(context, name, overload, stylesheet)
         return cairo_text_bbox(context, style, text)
     font_size = parse_css_size(style.get("font-size", "1em"))
     font_size = font_size[0] * font_size[1].value
@@ -646,4 +730,12 @@ def update_style(filepath: str):
         exit(8)
     with open(filepath, "r+") as fp:
         style = css_load(filepath)
-    DEFAULT_STYLE.update(style)
+    default_style().update(style)
+    invalidate_styles()
+
+
+def reset_style():
+    """discard the overloads of update_style and restore the default style"""
+    default_style().clear()
+    default_style().update(css_load(DEFAULT_CSS))
+    invalidate_styles()
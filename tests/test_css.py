@@ -207,6 +207,20 @@ class TestCss(unittest.TestCase):
     def test_rules(self):
         pass
 
+    def test_resolved_style(self):
+        stylesheet = {"path": {"stroke-width": 1.0}}
+        style = us.get_style("path s2", {"stroke-dasharray": [3, 3]}, stylesheet)
+        self.assertEqual(style["stroke-dasharray"], [3, 3])
+        self.assertIs(
+            style, us.get_style("path s2", {"stroke-dasharray": [3, 3]}, stylesheet)
+        )
+        with self.assertRaises(TypeError):
+            style["stroke-width"] = 2.0
+        # a modified stylesheet is resolved again after an invalidation
+        stylesheet["path"]["stroke-width"] = 2.0
+        us.invalidate_styles()
+        self.assertEqual(us.get_style("path", stylesheet=stylesheet)["stroke-width"], 2.0)
+
     def test_unsupported_properties(self):
         pass
 
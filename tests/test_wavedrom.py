@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import sys
+import copy
 import argparse
 import unittest
 
 # imports as in undulate.py
 import importlib
-from undulate.renderers.renderer import Renderer
+import undulate
+from undulate.renderers.renderer import Renderer, RenderContext
 from undulate.renderers.svgrenderer import SvgRenderer
 from undulate.renderers.cairorenderer import CairoRenderer
-from undulate.bricks.generic import NodeBank, Point
+from undulate.bricks.generic import BrickFactory, FilterBank, Point
+from undulate.bricks.generic import report_expressions, safe_eval
+from undulate.bricks.analogue import simplify
 
 RENDERER = None
 
@@ -296,9 +301,8 @@ class TestSvgMethods(unittest.TestCase):
         """
         width, height = 100, 100
         bwidth, bheight = 40, 20
-        NodeBank.nodes = {}
-        Renderer.y_steps = []
-        NodeBank.register("a_t", Point(bwidth * 2, bheight * 3 + 10.25))
+        context = RENDERER.new_context()
+        context.nodes.register("a_t", Point(bwidth * 2, bheight * 3 + 10.25))
         from_to = [
             "",
             "(1.0, 2.0)",
@@ -329,6 +333,414 @@ class TestSvgMethods(unittest.TestCase):
             assert p.x == e.x, f"Wrong x position for {p!r} expected {e.x} for {ft!r}"
             assert p.y == e.y, f"Wrong y position for {p!r} expected {e.y} for {ft!r}"
 
+    def test_spacer_nodes(self):
+        """
+        nodes of a lane without waveform are registered in the middle of the lane
+        """
+        renderer = SvgRenderer()
+        nodes = renderer.spacer_nodes(".a.# b", 30.0, 40)
+        assert nodes["a"] == Point(40, 30.0), "node shall be at its brick"
+        assert nodes["b"] == Point(120, 30.0), "expanded name shall be registered"
+        # edges of a diagram can refer to them without a previous diagram
+        wavelanes = {
+            "A": {"wave": "01..0..", "node": ".a....."},
+            " ": {"node": "...g..h"},
+            "edge": ["a-g", "g<->h 3 ms"],
+        }
+        renderer.draw(wavelanes, output=io.StringIO())
+        assert renderer.context.nodes.nodes["h"].x == 6 * 40, "spacer node not registered"
+
+    def test_jsonml_loads(self):
+        """
+        relaxed json dialect of WaveDrom
+        """
+        import undulate.logger as log
+        from undulate.parsers import jsonml
+
+        content = """{
+          // comment
+          signal: [
+            {name: 'clk', wave: 'p...', data: 'say \\"hi\\" it\\'s "ok"'},
+            {name: "url", wave: "x=", data: ["http://a//b"]},
+          ],
+          config: {hscale: 0x10, width: 8'hff, bits: 4'b1010,},
+        }"""
+        _, ans = jsonml.loads(content)
+        assert ans["clk"]["data"] == 'say "hi" it\'s "ok"', "escapes shall be kept"
+        assert ans["url"]["data"] == ["http://a//b"], "// in a string is not a comment"
+        assert ans["config"] == {"hscale": 16, "width": 255, "bits": 10}
+        with self.assertRaises(log.FatalError) as error:
+            jsonml.loads("{\n  a: 1,\n  b: @\n}")
+        assert error.exception.msg.endswith("at line 3 column 6"), error.exception.msg
+
+    def test_svg_stream(self):
+        """
+        svg written into a stream is the same as the one written in a file
+        """
+        filename = "%s/svg_stream.svg" % os.getenv("OUTPATH", ".")
+        wavelanes = {
+            "clk": {"wave": "p......"},
+            "Bus": {"wave": "x.=.=.x", "data": ["head", "body"]},
+            "wire": {"wave": "0.1..0.", "node": "..a..b."},
+            "edge": ["a~>b"],
+        }
+        renderer = SvgRenderer()
+        renderer.draw(copy.deepcopy(wavelanes), filename=filename)
+        stream = io.StringIO()
+        renderer.draw(copy.deepcopy(wavelanes), output=stream)
+        with open(filename, "r") as fp:
+            assert fp.read() == stream.getvalue(), "svg stream differs from svg file"
+
+    def test_svg_symbols(self):
+        """
+        identical bricks are defined once and reused
+        """
+        filename = "%s/svg_symbols.svg" % os.getenv("OUTPATH", ".")
+        wavelanes = {"clk": {"wave": "p" + "." * 31}}
+        SvgRenderer(symbols=True).draw(wavelanes, filename=filename)
+        with open(filename, "r") as fp:
+            svg = fp.read()
+        assert svg.count("<use ") == 32, "each brick shall be a <use> element"
+        assert svg.count('<g id="brick-') < 4, "clock bricks shall be reused"
+
+    def test_brick_cache(self):
+        """
+        bricks with the same geometry share it but not their arguments
+        """
+        a = BrickFactory.create("h", brick_width=40, slewing=2, node_name="a", fill="red")
+        b = BrickFactory.create("h", brick_width=40, slewing=2, node_name="b")
+        c = BrickFactory.create("h", brick_width=20, slewing=2)
+        assert a.paths is b.paths, "same geometry shall be shared"
+        assert a.paths is not c.paths, "different geometry shall not be shared"
+        assert (a.node_name, b.node_name) == ("a", "b"), "node shall be bound to the brick"
+        assert "fill" in a.args and "fill" not in b.args, "args shall be bound to the brick"
+        assert isinstance(a.paths, tuple), "shared geometry shall be frozen"
+        with self.assertRaises(AttributeError):
+            b.paths.append(None)
+        s1 = BrickFactory.create("s", brick_width=40, analogue="rnd()")
+        s2 = BrickFactory.create("s", brick_width=40, analogue="rnd()")
+        assert s1.paths is not s2.paths, "bricks are not cached by default"
+
+    def test_layout(self):
+        """
+        size and wavegroup share the layout of the drawing
+        """
+        renderer = SvgRenderer()
+        obj = {
+            "clk": {"wave": "P......"},
+            "group": {"data": {"wave": "x.345x.", "data": "a b c"}},
+            "nodes": {"node": "..a..b."},
+        }
+        size = renderer.size(obj, brick_width=20, brick_height=20)
+        layout = renderer.context.layout
+        assert layout.wavelanes is obj, "layout shall be kept for the drawing"
+        assert [lane.kind for lane in layout.lanes] == ["wave", "group", "spacer"]
+        assert size == (layout.title_width, layout.width, layout.height, layout.attributes)
+        assert layout.groups == 1 and layout.wave_width == 140
+        # positions are known before drawing
+        assert [lane.y for lane in layout.lanes] == [0, 25, 75]
+        assert layout.y_steps == [(25, False), (25, True), (25, False), (25, False)]
+        nodes = layout.lanes[2].nodes
+        assert (nodes["a"], nodes["b"]) == (Point(40, 85), Point(100, 85))
+
+    def test_failed_expressions(self):
+        """
+        a string which is not an expression is reported once per drawing
+        """
+        from unittest import mock
+
+        wavelanes = {
+            "A": {"wave": "x=.=x", "data": "head body"},
+            "B": {"wave": "x=.=x", "data": "head body"},
+        }
+        with mock.patch("undulate.logger.note") as note:
+            for _ in range(2):
+                SvgRenderer().draw(copy.deepcopy(wavelanes), output=io.StringIO())
+        messages = [call.args[0] for call in note.call_args_list]
+        assert messages.count("Failed to parse 'head body' consider as normal string") == 2
+        # bricks evaluating expressions report them without being given the set
+        with mock.patch("undulate.logger.note") as note:
+            with report_expressions(set()) as reported:
+                assert safe_eval("VDDA/") == safe_eval("VDDA/") == "VDDA/"
+        assert note.call_count == 1 and reported == {"VDDA/"}
+
+    def test_log_level(self):
+        """
+        messages follow the level set by the application through logging
+        """
+        import undulate.logger as log
+
+        with self.assertLogs(level="DEBUG") as logs:
+            log.debug("debug message")
+        assert logs.output == ["DEBUG:root:debug message"]
+
+    def test_log_application_level(self):
+        """
+        the level set by the application wins over logging.json
+        """
+        import logging
+        from unittest import mock
+        import undulate.logger as log
+
+        assert [log.DEBUG, log.INFO, log.WARNING, log.ERROR, log.CRITICAL] == [
+            logging.DEBUG,
+            logging.INFO,
+            logging.WARNING,
+            logging.ERROR,
+            logging.CRITICAL,
+        ]
+        root = logging.getLogger()
+        level, handlers = root.level, list(root.handlers)
+        config = {**log._LOG_CONFIG, "root": {"handlers": [], "level": "DEBUG"}}
+        try:
+            root.setLevel(logging.WARNING)
+            with mock.patch.object(log, "_LOG_CONFIG", config):
+                with mock.patch.object(log, "_CONFIGURED", False):
+                    log.configure()
+            assert root.level == logging.WARNING, "level of the application shall be kept"
+        finally:
+            root.setLevel(level)
+            root.handlers[:] = handlers
+
+    def test_adjust_y(self):
+        """
+        titles of groups are skipped when indexing wavelanes
+        """
+        renderer = SvgRenderer()
+        for dy, is_title in [(25, False), (25, True), (30, False), (25, False)]:
+            renderer.register_y_step(dy, is_title)
+        assert renderer.adjust_y(0, 20) == 0
+        assert renderer.adjust_y(1, 20) == 50
+        assert renderer.adjust_y(1.5, 20) == 60
+        assert renderer.adjust_y(2, 20) == 80
+        assert renderer.adjust_y(4, 20) == 125
+
+    def test_reduce_wavelane(self):
+        """
+        values per brick are consumed and singular ones repeated
+        """
+        renderer = SvgRenderer()
+        bricks = renderer._reduce_wavelane(
+            "bus",
+            "x34",
+            ["a"],
+            data="b c",
+            periods=[1, 2],
+            slewing=[1, 2],
+            repeat=2,
+            width=240,
+            brick_width=40,
+        )
+        assert [b.args.get("data") for b in bricks if b.symbol != "x"] == ["b", "c", "", ""]
+        assert [b.args["period"] for b in bricks] == [1, 2, 1, 1, 1, 1]
+        assert [b.args["slewing"] for b in bricks] == [1, 2, 1, 2, 1, 2]
+        assert [b.node_name for b in bricks] == ["a", None, None, None, None, None]
+        assert not any("failed_expressions" in b.args for b in bricks)
+
+    def test_brick_args(self):
+        """
+        arguments shared by bricks are layered and never modified
+        """
+        shared = {"brick_width": 40, "data": ["a", "b"]}
+        a = BrickFactory.describe("2", shared, data="a")
+        b = BrickFactory.describe("2", shared, data="b")
+        a.args["brick_width"] = 20
+        assert a.args["brick_width"] == 20 and b.args["brick_width"] == 40
+        assert shared == {"brick_width": 40, "data": ["a", "b"]}
+        assert a.build().args["data"] == "a" and b.build().width == 40
+
+    def test_simplify(self):
+        """
+        vertices of analogue curves within the tolerance are dropped
+        """
+        points = [Point(t, 0.01 * (t % 2)) for t in range(10)] + [Point(10, 5)]
+        assert simplify(points) == points, "no tolerance shall keep all points"
+        assert simplify(points, 0.1) == [Point(0, 0), Point(9, 0.01), Point(10, 5)]
+
+    def test_filters_once(self):
+        """
+        a bricks module initialized again does not apply its filters twice
+        """
+        filters = list(FilterBank.filters)
+        importlib.import_module("undulate.bricks.digital").initialize()
+        assert FilterBank.filters == filters, "filters shall be registered once"
+
+    def test_lazy_bricks(self):
+        """
+        declared symbols are registered on their first use
+        """
+        BrickFactory.declare("undulate.bricks.register", ["[", ":", "]", "b"])
+        assert BrickFactory.resolve("b"), "declared symbol shall be loaded on first use"
+        assert "[" in BrickFactory.funcs, "all symbols of the module shall be registered"
+        assert not BrickFactory.resolve("~"), "undeclared symbol shall not be found"
+
+    def test_render_bytes(self):
+        """
+        rendering in memory gives the content of the generated file
+        """
+        filename = "%s/render_bytes.svg" % os.getenv("OUTPATH", ".")
+        wavelanes = {
+            "clk": {"wave": "p......"},
+            "Bus": {"wave": "x.=.=.x", "data": ["head", "body"]},
+        }
+        SvgRenderer().draw(copy.deepcopy(wavelanes), filename=filename)
+        svg = undulate.render(copy.deepcopy(wavelanes), engine="svg")
+        with open(filename, "rb") as fp:
+            assert fp.read() == svg, "svg in memory differs from svg file"
+
+    def test_svg_failure(self):
+        """
+        a failed drawing keeps the previous file
+        """
+        filename = "%s/svg_failure.svg" % os.getenv("OUTPATH", ".")
+        wavelanes = {"clk": {"wave": "p......", "node": ".a..b.."}}
+        SvgRenderer().draw(copy.deepcopy(wavelanes), filename=filename)
+        with open(filename, "rb") as fp:
+            previous = fp.read()
+        wavelanes["annotations"] = [{"shape": "["}]
+        with self.assertRaises(SystemExit):
+            SvgRenderer().draw(copy.deepcopy(wavelanes), filename=filename)
+        with open(filename, "rb") as fp:
+            assert fp.read() == previous, "a failed drawing shall not modify the file"
+        names = os.listdir(os.path.dirname(filename))
+        assert not any(name.endswith(".tmp") for name in names), "temporary file left"
+
+    def test_batch_outputs(self):
+        """
+        inputs with the same name are rendered into distinct outputs
+        """
+        import undulate.cli as cli
+
+        inputs = [
+            "wavetest.json",
+            "wavetest.yaml",
+            "a/clk.json",
+            "b/clk.json",
+            "adcec.jsonml",
+        ]
+        outputs = cli.batch_outputs(inputs, "out", "svg")
+        assert list(outputs) == inputs, "each input shall have an output"
+        assert len(set(outputs.values())) == len(inputs), "outputs shall be distinct"
+        assert outputs["wavetest.json"] == os.path.join("out", "wavetest-json.svg")
+        assert outputs["b/clk.json"] == os.path.join("out", "b", "clk.svg")
+        assert outputs["adcec.jsonml"] == os.path.join("out", "adcec.svg")
+
+    def test_parse_cache(self):
+        """
+        parsed files are cached and the least recently used evicted
+        """
+        import marshal
+        import tempfile
+        import undulate.cli as cli
+        import undulate.parsers.jsonml as parser
+
+        key = cli.cache_key(b"{}", parser)
+        assert key == cli.cache_key(b"{}", parser), "key shall be stable"
+        assert key != cli.cache_key(b"[]", parser), "key shall depend on the content"
+        with tempfile.TemporaryDirectory() as cache_dir:
+            data = [marshal.dumps(({"clk": {"wave": "p" * i}}, [])) for i in range(3)]
+            for i in range(2):
+                cli.cache_store(cache_dir, f"entry{i}", data[i])
+                os.utime(os.path.join(cache_dir, f"entry{i}.marshal"), (i, i))
+            # reading an entry makes it the most recently used
+            assert cli.cache_load(cache_dir, "entry0") == marshal.loads(data[0])
+            max_size = len(data[0]) + len(data[2])
+            cli.cache_store(cache_dir, "entry2", data[2], max_size=max_size)
+            assert sorted(os.listdir(cache_dir)) == ["entry0.marshal", "entry2.marshal"]
+            assert cli.cache_load(cache_dir, "entry1") is None
+
+    def test_manifest(self):
+        """
+        an output is up to date until its input or its options change
+        """
+        import tempfile
+        import undulate.cli as cli
+
+        with tempfile.TemporaryDirectory() as folder:
+            input_path = os.path.join(folder, "clk.json")
+            output_path = os.path.join(folder, "clk.svg")
+            with open(input_path, "wt") as fp:
+                fp.write('{"clk": {"wave": "p..."}}')
+            manifest = cli.render_manifest(input_path, "svg", False, 150.0, "")
+            assert not cli.is_up_to_date(output_path, manifest), "no output yet"
+            with open(output_path, "wt") as fp:
+                fp.write("<svg/>")
+            assert not cli.is_up_to_date(output_path, manifest), "no manifest yet"
+            cli.write_manifest(output_path, manifest)
+            assert os.path.exists(os.path.join(folder, ".clk.svg.undulate"))
+            assert cli.is_up_to_date(output_path, manifest)
+            other = cli.render_manifest(input_path, "svg", False, 300.0, "")
+            assert not cli.is_up_to_date(output_path, other), "options changed"
+            with open(input_path, "wt") as fp:
+                fp.write('{"clk": {"wave": "n..."}}')
+            other = cli.render_manifest(input_path, "svg", False, 150.0, "")
+            assert not cli.is_up_to_date(output_path, other), "input changed"
+            os.remove(output_path)
+            assert not cli.is_up_to_date(output_path, manifest), "output removed"
+
+    def test_check_request(self):
+        """
+        requests of the render server are validated and completed
+        """
+        from undulate.server import BadRequest, check_request, request_key
+
+        request = check_request({"input": "{}", "dpi": "300"})
+        assert request["dpi"] == 300.0 and request["engine"] == "svg"
+        for invalid in [
+            {"input": "{}", "size": 2},
+            {"input": "{}", "dpi": "high"},
+            {"input": "{}", "format": "xml"},
+            {"input": "{}", "engine": "term"},
+            {"input": 2},
+        ]:
+            with self.assertRaises(BadRequest):
+                check_request(invalid)
+        same = check_request({"dpi": 300, "input": "{}", "format": "json"})
+        assert request_key(request) == request_key(same), "key shall not depend on order"
+        other = check_request({"input": "{}", "dpi": 200})
+        assert request_key(request) != request_key(other)
+
+    def test_render_service(self):
+        """
+        outputs of the render server are cached and a broken pool replaced
+        """
+        import concurrent.futures
+        from concurrent.futures.process import BrokenProcessPool
+        from http import HTTPStatus
+        from unittest import mock
+        from undulate.server import RenderService, check_request, render_request
+
+        def submit(func, *args):
+            # render in this process instead of a worker
+            future = concurrent.futures.Future()
+            future.set_result(func(*args))
+            return future
+
+        request = {"input": '{"clk": {"wave": "p..."}}'}
+        service = RenderService(jobs=1, cache_entries=1)
+        try:
+            with mock.patch.object(service.pool, "submit", side_effect=submit) as calls:
+                status, svg, cached = service.render(request)
+                assert status == HTTPStatus.OK and svg.startswith(b"<svg") and not cached
+                assert service.render(request) == (status, svg, True)
+                service.render({**request, "dpi": 300})
+                assert calls.call_count == 2, "a cached output shall not be rendered"
+                assert service.render(request)[2] is False, "oldest output evicted"
+            pool = service.pool
+            broken = concurrent.futures.Future()
+            broken.set_exception(BrokenProcessPool())
+            with mock.patch.object(pool, "submit", return_value=broken):
+                status, _, _ = service.render({**request, "is_reg": False, "dpi": 1})
+            assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+            assert service.pool is not pool, "a broken pool shall be replaced"
+        finally:
+            service.close()
+        status, payload = render_request(check_request({"input": "{}"}), 10.0)
+        assert status == HTTPStatus.BAD_REQUEST and isinstance(payload, str)
+        status, payload = render_request(check_request(request), 10.0)
+        assert (status, payload) == (HTTPStatus.OK, svg), "same output as the service"
+
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()